@@ -0,0 +1,128 @@
+import functools
+import os
+import socket
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from database import engine
+from models import Generation, SharedCacheEntry
+
+# Identifies this worker process in the leader lease
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+LEADER_LEASE = "scheduler"
+LEASE_SECONDS = 30
+HEARTBEAT_SECONDS = 10
+# How stale a worker's view of the invalidation counters may get
+GENERATION_POLL_SECONDS = 1.0
+
+_is_leader = False
+_generations = {}
+_generations_checked = 0.0
+
+
+# --- Leader election -------------------------------------------------------
+
+def renew_leadership() -> bool:
+    """
+    Takes or extends the scheduler lease. The lease is free when it has
+    expired, so a crashed leader is replaced within LEASE_SECONDS.
+    """
+    global _is_leader
+    now = time.time()
+    with Session(engine) as session:
+        # Single UPSERT so two workers can never both win the same expired lease
+        session.exec(text(
+            "INSERT INTO lease (name, holder, expires_at) VALUES (:name, :holder, :expires) "
+            "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+            "WHERE lease.expires_at < :now OR lease.holder = :holder"
+        ).bindparams(name=LEADER_LEASE, holder=WORKER_ID, expires=now + LEASE_SECONDS, now=now))
+        session.commit()
+        holder = session.exec(text("SELECT holder FROM lease WHERE name = :name").bindparams(name=LEADER_LEASE)).scalar()
+
+    was_leader, _is_leader = _is_leader, holder == WORKER_ID
+    if _is_leader != was_leader:
+        print(f"Worker {WORKER_ID} {'is now' if _is_leader else 'is no longer'} the scheduler leader.")
+    return _is_leader
+
+
+def release_leadership():
+    global _is_leader
+    if not _is_leader:
+        return
+    with Session(engine) as session:
+        session.exec(text("UPDATE lease SET expires_at = 0 WHERE name = :name AND holder = :holder")
+                     .bindparams(name=LEADER_LEASE, holder=WORKER_ID))
+        session.commit()
+    _is_leader = False
+
+
+def is_leader() -> bool:
+    return _is_leader
+
+
+def leader_only(job):
+    """Wraps a scheduled coroutine so it only runs in the current leader."""
+    @functools.wraps(job)
+    async def wrapper(*args, **kwargs):
+        if not _is_leader:
+            return None
+        return await job(*args, **kwargs)
+    return wrapper
+
+
+# --- Cross-worker invalidation ---------------------------------------------
+
+def invalidate(name: str):
+    """Bumps the generation of a cache so every worker rebuilds it."""
+    with Session(engine) as session:
+        session.exec(text(
+            "INSERT INTO generation (name, value) VALUES (:name, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+        ).bindparams(name=name))
+        session.commit()
+    _refresh_generations()
+
+
+def _refresh_generations():
+    global _generations, _generations_checked
+    with Session(engine) as session:
+        _generations = {g.name: g.value for g in session.exec(select(Generation)).all()}
+    _generations_checked = time.monotonic()
+
+
+def generation(name: str) -> int:
+    """Current generation of a cache, as seen by this worker (at most GENERATION_POLL_SECONDS old)."""
+    if time.monotonic() - _generations_checked > GENERATION_POLL_SECONDS:
+        _refresh_generations()
+    return _generations.get(name, 0)
+
+
+# --- Shared key/value cache ------------------------------------------------
+
+def shared_get(key: str) -> Optional[bytes]:
+    with Session(engine) as session:
+        entry = session.get(SharedCacheEntry, key)
+        if entry is None or (entry.expires_at is not None and entry.expires_at < time.time()):
+            return None
+        return entry.value
+
+
+def shared_set(key: str, value: bytes, ttl: Optional[float] = None):
+    with Session(engine) as session:
+        # Single UPSERT: two workers may store the same key at the same time
+        session.exec(text(
+            "INSERT INTO sharedcacheentry (key, value, expires_at) VALUES (:key, :value, :expires) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+        ).bindparams(key=key, value=value, expires=time.time() + ttl if ttl else None))
+        session.commit()
+
+
+def purge_expired():
+    with Session(engine) as session:
+        session.exec(text("DELETE FROM sharedcacheentry WHERE expires_at IS NOT NULL AND expires_at < :now")
+                     .bindparams(now=time.time()))
+        session.commit()
@@ -1,3 +1,5 @@
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
 from sqlmodel import SQLModel, create_engine, Session
 
 sqlite_file_name = "database.db"
@@ -5,8 +7,24 @@ sqlite_url = f"sqlite:///{sqlite_file_name}"
 
 engine = create_engine(sqlite_url, connect_args={"check_same_thread": False})
 
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets several uvicorn workers read while one writes; wait on locks instead of failing
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    # Workers start concurrently; if another one created a table between our
+    # existence check and CREATE, just run the (idempotent) check again.
+    for attempt in range(3):
+        try:
+            SQLModel.metadata.create_all(engine)
+            return
+        except OperationalError:
+            if attempt == 2:
+                raise
 
 def get_session():
     with Session(engine) as session:
@@ -0,0 +1,146 @@
+import asyncio
+import collections
+import hmac
+import os
+import sys
+import threading
+import time
+import traceback
+
+# Admin-only diagnostics are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+LOOP_MONITOR_ENABLED = os.environ.get("LOOP_MONITOR", "1") != "0"
+# How often the heartbeat task wakes up, and how late it may be before we log a stall
+LOOP_LAG_INTERVAL = 0.1
+LOOP_LAG_THRESHOLD = float(os.environ.get("LOOP_LAG_THRESHOLD_MS", "200")) / 1000
+
+PROFILE_INTERVAL = 0.005
+# Leaf frames of a thread that is parked, not working
+IDLE_FILES = ("selectors.py", "threading.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+
+
+def is_admin(request) -> bool:
+    # Compared as bytes: compare_digest rejects non-ASCII str, and headers may
+    # contain anything. Starlette decodes headers as latin-1, which gives back the raw bytes.
+    token = request.headers.get("x-admin-token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode("latin-1"), ADMIN_TOKEN.encode("utf-8"))
+
+
+def _format_stack(frame) -> str:
+    return "".join(traceback.format_stack(frame))
+
+
+class LoopMonitor:
+    """
+    Measures event-loop scheduling delay. A heartbeat task records how late
+    each wake-up is; a watcher thread notices when the heartbeat stops
+    while the loop is blocked and logs what the loop thread is running.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = LOOP_LAG_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_beat = time.monotonic()
+        self.recent = collections.deque(maxlen=600)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.last_stall = None
+        self._loop_thread = None
+        self._task = None
+        self._stop = threading.Event()
+        self._reported = False
+
+    async def _heartbeat(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = now - started - self.interval
+            self.last_beat = now
+            self.recent.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                if not self._reported:
+                    # Too short for the watcher to catch; still worth a line
+                    print(f"Event loop lag: {lag * 1000:.0f} ms")
+            self._reported = False
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            blocked = time.monotonic() - self.last_beat - self.interval
+            if blocked <= self.threshold or self._reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._reported = True
+            stack = _format_stack(frame)
+            self.last_stall = {"at": time.time(), "blocked_ms": round(blocked * 1000), "stack": stack}
+            print(f"Event loop blocked for {blocked * 1000:.0f} ms, loop thread is at:\n{stack}")
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-monitor", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    def stats(self) -> dict:
+        recent = sorted(self.recent)
+        p99 = recent[int(len(recent) * 0.99)] if recent else 0.0
+        return {
+            "threshold_ms": round(self.threshold * 1000),
+            "last_ms": round(self.recent[-1] * 1000, 1) if self.recent else None,
+            "p99_ms": round(p99 * 1000, 1),
+            "max_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stalls,
+            "last_stall": self.last_stall,
+        }
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every busy thread while active and aggregates them
+    as folded stacks ("outer;inner;leaf count" lines), the input format of
+    flamegraph.pl and speedscope. It sees the whole process, so profile
+    while the server is otherwise quiet.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
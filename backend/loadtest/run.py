@@ -0,0 +1,371 @@
+"""
+Offline load test: starts the backend against the stub upstream (see
+loadtest/server.py) in a scratch directory, drives it with a traffic mix
+at increasing concurrency, and reports per-route latency, throughput,
+errors and server CPU/RSS for every stage.
+
+    cd backend
+    python -m loadtest.run --mix mixed --ramp 1,10,25,50 --stage-seconds 20 --workers 2
+
+--url targets an already running server instead (add --pid to sample its
+CPU/RSS). --json writes the full results for comparing runs.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from collections import defaultdict
+
+import fitz  # PyMuPDF
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scenario weights; one scenario is one user action, possibly several requests
+MIXES = {
+    "homepage": {"homepage": 1},
+    "browse": {"homepage": 3, "search": 2},
+    "documents": {"epub": 1, "pdf": 1},
+    "mixed": {"homepage": 8, "search": 3, "epub": 1, "pdf": 1},
+}
+
+# The homepage shows a favicon per bookmark; sites are drawn from a pool so the cache sees repeats
+FAVICONS_PER_PAGE = 12
+# The app grid loads the catalog through /tools/search, this many tools at a time
+# (PAGE_SIZE in frontend/components/ui/app-grid.tsx); some users press "load more"
+GRID_PAGE_SIZE = 48
+LOAD_MORE_RATE = 0.3
+SEARCH_TERMS = ["py", "git", "no", "vs", "med", "ga", "st", "obs", "code", "java"]
+REQUEST_TIMEOUT = 60.0
+RESOURCE_INTERVAL = 1.0
+
+
+def make_epub(kb: int) -> bytes:
+    paragraph = "<p>Harry met Hermione &amp; Ron at Hogwarts before the winter term began.</p>"
+    chapters = max(1, kb // 32)
+    per_chapter = max(1, kb * 1024 // chapters // len(paragraph))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip")
+        zf.writestr("META-INF/container.xml",
+                    '<?xml version="1.0"?><container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+                    '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles></container>')
+        manifest = "".join(f'<item id="c{i}" href="c{i}.xhtml" media-type="application/xhtml+xml"/>' for i in range(chapters))
+        spine = "".join(f'<itemref idref="c{i}"/>' for i in range(chapters))
+        zf.writestr("OEBPS/content.opf",
+                    '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+                    f"<manifest>{manifest}</manifest><spine>{spine}</spine></package>")
+        for i in range(chapters):
+            zf.writestr(f"OEBPS/c{i}.xhtml",
+                        '<?xml version="1.0" encoding="utf-8"?><html xmlns="http://www.w3.org/1999/xhtml">'
+                        f"<head><title>Chapter {i}</title></head><body><h1>Chapter {i}</h1>{paragraph * per_chapter}</body></html>")
+    return buffer.getvalue()
+
+
+def make_pdf(pages: int) -> bytes:
+    with fitz.open() as doc:
+        for i in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Load test page {i + 1}", fontsize=24)
+            page.draw_rect(fitz.Rect(72, 120, 520, 700), color=(0.2, 0.4, 0.8), fill=(0.9, 0.9, 1.0))
+        return doc.tobytes()
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        """Returns the response, or None if the request failed."""
+        started = time.perf_counter()
+        resp = None
+        try:
+            resp = await client.request(method, url, **kwargs)
+            failed = resp.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.samples[route].append(time.perf_counter() - started)
+        if failed:
+            self.errors[route] += 1
+            return None
+        return resp
+
+
+async def browse_grid(client, recorder, rng, q: str = ""):
+    params = {"limit": GRID_PAGE_SIZE}
+    if q:
+        params["q"] = q
+    resp = await recorder.request(client, "GET /tools/search", "GET", "/tools/search", params=params)
+    cursor = resp.json().get("next_cursor") if resp is not None else None
+    if cursor and rng.random() < LOAD_MORE_RATE:
+        await recorder.request(client, "GET /tools/search (next page)", "GET", "/tools/search",
+                               params={**params, "cursor": cursor})
+
+
+async def homepage(client, recorder, fixtures, rng):
+    await asyncio.gather(
+        browse_grid(client, recorder, rng),
+        recorder.request(client, "GET /news", "GET", "/news"),
+        *(
+            recorder.request(client, "GET /api/favicon", "GET", "/api/favicon",
+                             params={"url": f"https://site{rng.randrange(fixtures['favicon_sites'])}.example/"})
+            for _ in range(FAVICONS_PER_PAGE)
+        ),
+    )
+
+
+async def search(client, recorder, fixtures, rng):
+    await browse_grid(client, recorder, rng, rng.choice(SEARCH_TERMS))
+
+
+async def epub(client, recorder, fixtures, rng):
+    await recorder.request(client, "POST /api/tools/epub-replace", "POST", "/api/tools/epub-replace", files=[
+        ("files", ("book.epub", fixtures["epub"], "application/epub+zip")),
+        ("glossary_file", ("glossary.json", fixtures["glossary"], "application/json")),
+    ])
+
+
+async def pdf(client, recorder, fixtures, rng):
+    await recorder.request(client, "POST /api/tools/pdf-to-image", "POST", "/api/tools/pdf-to-image", files={
+        "file": ("document.pdf", fixtures["pdf"], "application/pdf"),
+    })
+
+
+SCENARIOS = {"homepage": homepage, "search": search, "epub": epub, "pdf": pdf}
+
+
+def _process_tree(pid: int) -> list:
+    children = defaultdict(list)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children[ppid].append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children[current])
+    return tree
+
+
+def _read_usage(pids: list) -> tuple:
+    """Total CPU seconds and RSS bytes of the given processes."""
+    ticks = os.sysconf("SC_CLK_TCK")
+    page = os.sysconf("SC_PAGE_SIZE")
+    cpu = rss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+            rss += int(fields[21]) * page
+        except (OSError, IndexError, ValueError):
+            continue
+    return cpu, rss
+
+
+async def sample_resources(pid: int, out: list, stop: asyncio.Event):
+    last_cpu, _ = _read_usage(_process_tree(pid))
+    last_time = time.monotonic()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), RESOURCE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        cpu, rss = _read_usage(_process_tree(pid))
+        now = time.monotonic()
+        out.append({"t": time.time(), "cpu_percent": (cpu - last_cpu) / (now - last_time) * 100, "rss_bytes": rss})
+        last_cpu, last_time = cpu, now
+
+
+async def virtual_user(client, recorder, fixtures, mix, deadline, seed, think_time):
+    rng = random.Random(seed)
+    names, weights = zip(*mix.items())
+    while time.monotonic() < deadline:
+        await SCENARIOS[rng.choices(names, weights)[0]](client, recorder, fixtures, rng)
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, think_time * 2))
+
+
+def _percentile(sorted_values: list, p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def summarize(recorder: Recorder, elapsed: float, resources: list) -> dict:
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        values = sorted(samples)
+        routes[route] = {
+            "requests": len(values),
+            "errors": recorder.errors[route],
+            "rps": len(values) / elapsed,
+            "p50_ms": _percentile(values, 0.50) * 1000,
+            "p90_ms": _percentile(values, 0.90) * 1000,
+            "p99_ms": _percentile(values, 0.99) * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+    total = sum(r["requests"] for r in routes.values())
+    errors = sum(r["errors"] for r in routes.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": total,
+        "rps": total / elapsed,
+        "error_rate": errors / total if total else 0.0,
+        "routes": routes,
+        "cpu_percent_avg": sum(r["cpu_percent"] for r in resources) / len(resources) if resources else None,
+        "cpu_percent_max": max((r["cpu_percent"] for r in resources), default=None),
+        "rss_max_bytes": max((r["rss_bytes"] for r in resources), default=None),
+        "resources": resources,
+    }
+
+
+def print_stage(index: int, total: int, users: int, summary: dict):
+    print(f"\nStage {index}/{total}: {users} users, {summary['elapsed_s']:.0f}s")
+    print(f"  {'route':<32}{'reqs':>7}{'err%':>7}{'rps':>8}{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}  (ms)")
+    for route, r in summary["routes"].items():
+        err = r["errors"] / r["requests"] * 100
+        print(f"  {route:<32}{r['requests']:>7}{err:>7.1f}{r['rps']:>8.1f}"
+              f"{r['p50_ms']:>8.0f}{r['p90_ms']:>8.0f}{r['p99_ms']:>8.0f}{r['max_ms']:>8.0f}")
+    print(f"  total: {summary['requests']} requests, {summary['rps']:.1f} req/s, errors {summary['error_rate'] * 100:.2f}%")
+    if summary["rss_max_bytes"] is not None:
+        print(f"  server: cpu avg {summary['cpu_percent_avg']:.0f}% max {summary['cpu_percent_max']:.0f}%, "
+              f"rss max {summary['rss_max_bytes'] / 1024 ** 2:.0f} MB")
+
+
+def start_server(workers: int, port: int, stub_latency_ms: float) -> tuple:
+    """Runs the stubbed app from a scratch copy of the database and config."""
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    for name in ("apps.json", "database.db"):
+        if os.path.exists(os.path.join(BACKEND_DIR, name)):
+            shutil.copy(os.path.join(BACKEND_DIR, name), workdir)
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "STUB_LATENCY_MS": str(stub_latency_ms),
+        "DOWNLOAD_CACHE_DIR": os.path.join(workdir, "cache"),
+        "GLOSSARY_DIR": os.path.join(workdir, "glossaries"),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "loadtest.server:app", "--app-dir", BACKEND_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    return process, workdir
+
+
+async def wait_ready(url: str, process, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while time.monotonic() < deadline:
+            if process and process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                if (await client.get("/tools")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError("Server did not become ready")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run(args) -> dict:
+    mix = json.loads(args.mix) if args.mix.startswith("{") else MIXES[args.mix]
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios in mix: {', '.join(sorted(unknown))}")
+    stages = [int(n) for n in args.ramp.split(",")]
+    fixtures = {
+        "epub": make_epub(args.epub_kb),
+        "pdf": make_pdf(args.pdf_pages),
+        "glossary": json.dumps({"Harry": "Harold", "Hermione": "Hermia", "Hogwarts": "the castle"}).encode(),
+        "favicon_sites": args.favicon_sites,
+    }
+
+    process = workdir = None
+    url, pid = args.url, args.pid
+    if not url:
+        port = _free_port()
+        process, workdir = start_server(args.workers, port, args.stub_latency_ms)
+        url, pid = f"http://127.0.0.1:{port}", process.pid
+
+    results = {"mix": mix, "workers": args.workers if not args.url else None, "stages": []}
+    try:
+        await wait_ready(url, process)
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=max(stages) * 4)
+        async with httpx.AsyncClient(base_url=url, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+            for index, users in enumerate(stages, 1):
+                recorder = Recorder()
+                resources = []
+                stop = asyncio.Event()
+                sampler = asyncio.create_task(sample_resources(pid, resources, stop)) if pid else None
+                started = time.monotonic()
+                deadline = started + args.stage_seconds
+                await asyncio.gather(*(
+                    virtual_user(client, recorder, fixtures, mix, deadline, index * 100000 + n, args.think_time)
+                    for n in range(users)
+                ))
+                elapsed = time.monotonic() - started
+                stop.set()
+                if sampler:
+                    await sampler
+                summary = summarize(recorder, elapsed, resources)
+                summary["users"] = users
+                results["stages"].append(summary)
+                print_stage(index, len(stages), users, summary)
+    finally:
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default="mixed", help=f"one of {', '.join(MIXES)} or a JSON object of scenario weights")
+    parser.add_argument("--ramp", default="1,5,10,25", help="comma-separated concurrent users per stage")
+    parser.add_argument("--stage-seconds", type=float, default=20)
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's actions, in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned server")
+    parser.add_argument("--stub-latency-ms", type=float, default=50, help="simulated upstream round trip")
+    parser.add_argument("--favicon-sites", type=int, default=500, help="distinct sites favicons are drawn from")
+    parser.add_argument("--epub-kb", type=int, default=512)
+    parser.add_argument("--pdf-pages", type=int, default=5)
+    parser.add_argument("--url", help="test an already running server instead of spawning one")
+    parser.add_argument("--pid", type=int, help="with --url, the server process to sample CPU/RSS from")
+    parser.add_argument("--json", help="write the full results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
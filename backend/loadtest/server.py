@@ -0,0 +1,22 @@
+"""
+The backend app with every outgoing httpx request answered by the local
+stub upstream. Serve it like the real app, from a scratch working directory:
+
+    uvicorn loadtest.server:app --app-dir /path/to/backend --workers 4
+"""
+import httpx
+
+from loadtest.stub_upstream import app as stub_app
+
+_original_init = httpx.AsyncClient.__init__
+
+
+def _stubbed_init(self, *args, **kwargs):
+    kwargs["transport"] = httpx.ASGITransport(app=stub_app)
+    _original_init(self, *args, **kwargs)
+
+
+# Must run before main is imported so module-level clients are covered too
+httpx.AsyncClient.__init__ = _stubbed_init
+
+from main import app  # noqa: E402
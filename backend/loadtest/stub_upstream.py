@@ -0,0 +1,137 @@
+"""
+A stand-in for every upstream the backend talks to (GitHub, VS Code,
+nodejs.org, python.org, VideoLAN, favicon services, mirrors and arbitrary
+websites), so load tests run offline and measure only our own code.
+
+STUB_LATENCY_MS adds a simulated round trip to every response (default 50,
+with up to 50% jitter); STUB_FAIL_RATE makes that fraction of requests fail
+with a 502 to exercise fallback paths.
+"""
+import asyncio
+import io
+import json
+import os
+import random
+import re
+
+from PIL import Image
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+LATENCY = float(os.environ.get("STUB_LATENCY_MS", "50")) / 1000
+FAIL_RATE = float(os.environ.get("STUB_FAIL_RATE", "0"))
+# Largest body handed out for a download, whatever the Range asks for
+MAX_DOWNLOAD_BYTES = 1024 * 1024
+
+_buffer = io.BytesIO()
+Image.new("RGBA", (32, 32), (40, 120, 220, 255)).save(_buffer, "PNG")
+ICON_PNG = _buffer.getvalue()
+ICON_SVG = b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 32 32"><circle cx="16" cy="16" r="14" fill="#2878dc"/></svg>'
+DOWNLOAD_BLOCK = os.urandom(64 * 1024)
+
+TRENDING_HTML = "<html><body>" + "".join(
+    f'<article class="Box-row"><h2><a href="/stub-org/project-{i}">stub-org / project-{i}</a></h2>'
+    f'<p>Stub repository number {i} for load testing.</p>'
+    f'<span itemprop="programmingLanguage">{["Python", "TypeScript", "Go", "Rust"][i % 4]}</span></article>'
+    for i in range(25)
+) + "</body></html>"
+
+PYTHON_DOWNLOADS_HTML = "<html><body>" + "".join(
+    f'<li><a href="https://www.python.org/ftp/python/{v}/python-{v}-amd64.exe">Download Windows installer (64-bit)</a></li>'
+    for v in ("3.13.1", "3.12.8", "3.11.11")
+) + "</body></html>"
+
+NODE_INDEX = [
+    {"version": "v23.5.0", "lts": False},
+    {"version": "v22.12.0", "lts": "Jod"},
+    {"version": "v20.18.1", "lts": "Iron"},
+]
+
+
+def _site_html(host: str) -> str:
+    # A realistic <head>: scripts and styles before the icon links
+    return (
+        f"<!doctype html><html><head><title>{host}</title>"
+        '<meta charset="utf-8"><link rel="stylesheet" href="/app.css"><script src="/app.js"></script>'
+        '<link rel="icon" href="/favicon-32.png" sizes="32x32" type="image/png">'
+        '<link rel="apple-touch-icon" href="/apple-touch-icon.png" sizes="180x180">'
+        "</head><body>" + "<p>filler</p>" * 200 + "</body></html>"
+    )
+
+
+def _download(request: Request) -> Response:
+    match = re.match(r"bytes=(\d+)-(\d*)", request.headers.get("range", ""))
+    if not match:
+        return Response(DOWNLOAD_BLOCK * 16, media_type="application/octet-stream")
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else start + MAX_DOWNLOAD_BYTES - 1
+    length = min(end - start + 1, MAX_DOWNLOAD_BYTES)
+    body = (DOWNLOAD_BLOCK * (length // len(DOWNLOAD_BLOCK) + 1))[:length]
+    return Response(body, status_code=206, media_type="application/octet-stream",
+                    headers={"Content-Range": f"bytes {start}-{start + length - 1}/*"})
+
+
+async def _graphql(request: Request) -> Response:
+    query = (await request.json())["query"]
+    data = {
+        alias: {"latestRelease": {
+            "tagName": "v2.47.1",
+            "releaseAssets": {"nodes": [
+                {"name": "Git-2.47.1-64-bit.exe", "downloadUrl": "https://github.com/stub/releases/download/v2.47.1/Git-2.47.1-64-bit.exe"},
+                {"name": "OBS-Studio-30.2.3-Windows-Installer.exe", "downloadUrl": "https://github.com/stub/releases/download/30.2.3/OBS-Studio-30.2.3-Windows-Installer.exe"},
+            ]},
+        }}
+        for alias in re.findall(r"(r\d+):", query)
+    }
+    return JSONResponse({"data": data})
+
+
+def _release(request: Request) -> Response:
+    return JSONResponse({
+        "tag_name": "v2.47.1",
+        "assets": [
+            {"name": "Git-2.47.1-64-bit.exe", "browser_download_url": "https://github.com/stub/releases/download/v2.47.1/Git-2.47.1-64-bit.exe"},
+            {"name": "OBS-Studio-30.2.3-Windows-Installer.exe", "browser_download_url": "https://github.com/stub/releases/download/30.2.3/OBS-Studio-30.2.3-Windows-Installer.exe"},
+        ],
+    })
+
+
+async def upstream(request: Request) -> Response:
+    await asyncio.sleep(LATENCY * random.uniform(0.5, 1.5))
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        return PlainTextResponse("stub failure", status_code=502)
+
+    host = request.url.hostname or ""
+    path = request.url.path
+
+    if path.endswith((".exe", ".msi", ".zip", ".dmg", ".pkg")):
+        return _download(request)
+    if host == "github.com" and path == "/trending":
+        return HTMLResponse(TRENDING_HTML)
+    if host == "api.github.com":
+        if path == "/graphql":
+            return await _graphql(request)
+        if path.endswith("/releases/latest"):
+            return _release(request)
+    if host == "update.code.visualstudio.com":
+        return JSONResponse({"name": "1.96.2", "url": "https://vscode.download.prss.microsoft.com/dbazure/download/stable/stub/VSCodeUserSetup-x64-1.96.2.exe"})
+    if host == "nodejs.org" and path == "/dist/index.json":
+        return Response(json.dumps(NODE_INDEX), media_type="application/json")
+    if host == "www.python.org" and path.startswith("/downloads"):
+        return HTMLResponse(PYTHON_DOWNLOADS_HTML)
+    if host == "update.videolan.org":
+        return PlainTextResponse("3.0.21\n")
+    if host == "api.uomg.com" or (host == "www.google.com" and path.startswith("/s2/favicons")):
+        return Response(ICON_PNG, media_type="image/png")
+    if path.endswith(".svg"):
+        return Response(ICON_SVG, media_type="image/svg+xml")
+    if path.endswith((".png", ".ico")):
+        return Response(ICON_PNG, media_type="image/png")
+    if path.endswith((".css", ".js")):
+        return PlainTextResponse("", status_code=404)
+    return HTMLResponse(_site_html(host))
+
+
+app = Starlette(routes=[Route("/{path:path}", upstream, methods=["GET", "HEAD", "POST"])])
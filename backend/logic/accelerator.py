@@ -1,39 +1,229 @@
+import asyncio
+import time
+import httpx
+
+# Upstreams we know how to accelerate. Origins are written without a scheme and
+# match both http:// and https:// URLs; each mirror replaces the scheme and the
+# matched origin prefix. The order of "mirrors" is the preference before any
+# probe has run.
+# "probe" is a representative file used until a real download URL has been seen.
+MIRROR_GROUPS = {
+    # VS Code / Azure CDN Mirror
+    "vscode": {
+        "origins": ["az764295.vo.msecnd.net", "vscode.download.prss.microsoft.com"],
+        "mirrors": ["https://vscode.cdn.azure.cn"],
+        "probe": "https://vscode.download.prss.microsoft.com/dbazure/download/stable/1e790d77f81672c49be070e04474901747115651/VSCodeUserSetup-x64-1.85.1.exe",
+    },
+    # GitHub Release Proxies (covers Adoptium and other GitHub-hosted installers)
+    "github": {
+        "origins": ["github.com/"],
+        "requires": "/releases/download/",
+        "mirrors": [
+            "https://ghproxy.cn/https://github.com/",
+            "https://ghfast.top/https://github.com/",
+            "https://gh-proxy.com/https://github.com/",
+        ],
+        "probe": "https://github.com/git-for-windows/git/releases/download/v2.43.0.windows.1/Git-2.43.0-64-bit.exe",
+    },
+    "nodejs": {
+        "origins": ["nodejs.org/dist"],
+        "mirrors": [
+            "https://mirrors.huaweicloud.com/nodejs",
+            "https://mirrors.tuna.tsinghua.edu.cn/nodejs-release",
+            "https://mirrors.ustc.edu.cn/node",
+        ],
+        "probe": "https://nodejs.org/dist/v20.11.0/node-v20.11.0-x64.msi",
+    },
+    "python": {
+        "origins": ["www.python.org/ftp/python"],
+        "mirrors": [
+            "https://mirrors.huaweicloud.com/python",
+            "https://registry.npmmirror.com/-/binary/python",
+        ],
+        "probe": "https://www.python.org/ftp/python/3.12.1/python-3.12.1-amd64.exe",
+    },
+    # Go Mirror (USTC/Aliyun)
+    "go": {
+        "origins": ["go.dev/dl"],
+        "mirrors": [
+            "https://mirrors.ustc.edu.cn/golang",
+            "https://mirrors.aliyun.com/golang",
+            "https://golang.google.cn/dl",
+        ],
+        "probe": "https://go.dev/dl/go1.22.2.windows-amd64.msi",
+    },
+}
+
+PROBE_INTERVAL_MINUTES = 10
+PROBE_BYTES = 64 * 1024
+PROBE_TIMEOUT = 8.0
+# Weight of the newest probe in the rolling averages
+SCORE_ALPHA = 0.3
+# Consecutive failed probes before a mirror is taken out of rotation; one
+# timeout on a busy mirror should not send everyone to the origin
+UNHEALTHY_AFTER_FAILURES = 2
+# Mirrors are ranked by the estimated time to fetch an installer of this size,
+# so both the rolling latency and the rolling throughput count
+TYPICAL_DOWNLOAD_BYTES = 50 * 1024 * 1024
+
+# mirror prefix -> {"healthy", "latency", "throughput", "failures", "last_probe", "error"}
+_scores = {}
+# group name -> most recent origin URL passed through get_smart_link
+_samples = {}
+
+
+def _match_group(original_url: str):
+    """Returns (group name, index where the part after the origin starts), or (None, None)."""
+    address = original_url.split("://", 1)[-1]
+    for name, group in MIRROR_GROUPS.items():
+        if group.get("requires") and group["requires"] not in original_url:
+            continue
+        for origin in group["origins"]:
+            if address.startswith(origin):
+                return name, len(original_url) - len(address) + len(origin)
+    return None, None
+
+
+def _expected_seconds(score: dict) -> float:
+    return (score["latency"] or 0.0) + TYPICAL_DOWNLOAD_BYTES / score["throughput"]
+
+
+def _rank(mirror: str):
+    """Sort key: probed-healthy mirrors by expected download time, then unprobed, then unhealthy."""
+    score = _scores.get(mirror)
+    if score is not None and not score["healthy"]:
+        return (2, 0)
+    if score is None or not score["throughput"]:
+        # Never measured successfully
+        return (1, 0)
+    return (0, _expected_seconds(score))
+
+
+def best_mirror(group_name: str):
+    """
+    Returns the mirror prefix to use for a group, or None when every
+    probed mirror is down and downloads should go to the origin.
+    """
+    mirrors = MIRROR_GROUPS[group_name]["mirrors"]
+    # sorted() is stable, so unprobed mirrors keep their configured preference
+    best = sorted(mirrors, key=_rank)[0]
+    score = _scores.get(best)
+    if score is not None and not score["healthy"]:
+        return None
+    return best
+
+
+def mirror_selection() -> tuple:
+    """The mirror currently chosen for every group; changes whenever a probe flips the choice."""
+    return tuple(best_mirror(name) for name in MIRROR_GROUPS)
+
+
 def get_smart_link(original_url: str) -> str:
     """
     Apply zero-cost acceleration strategies to download URLs.
+    Picks the fastest healthy mirror measured by probe_mirrors, falling back to the origin.
     """
     if not original_url:
         return ""
 
-    # VS Code / Azure CDN Mirror
-    if "az764295.vo.msecnd.net" in original_url:
-        return original_url.replace("az764295.vo.msecnd.net", "vscode.cdn.azure.cn")
-    
-    if "vscode.download.prss.microsoft.com" in original_url:
-        return original_url.replace("vscode.download.prss.microsoft.com", "vscode.cdn.azure.cn")
-    
-    # GitHub Proxy
-    if "github.com" in original_url and "/releases/download/" in original_url:
-        # Using a common public proxy for demo purposes. 
-        # In production, this might be a configurable environment variable.
-        proxy_prefix = "https://ghproxy.cn/" 
-        return f"{proxy_prefix}{original_url}"
-    
-    # Node.js Mirror (Huawei)
-    if "nodejs.org/dist" in original_url:
-        return original_url.replace("nodejs.org/dist", "mirrors.huaweicloud.com/nodejs")
-    
-    # Python Mirror (Huawei)
-    if "www.python.org/ftp/python" in original_url:
-        return original_url.replace("www.python.org/ftp/python", "mirrors.huaweicloud.com/python")
-    
-    # Go Mirror (TUNA/USTC)
-    if "go.dev/dl" in original_url:
-        return original_url.replace("go.dev/dl", "mirrors.ustc.edu.cn/golang")
-    
-    # Java (Adoptium/TUNA)
-    if "github.com/adoptium" in original_url and "/releases/download/" in original_url:
-        proxy_prefix = "https://ghproxy.cn/" 
-        return f"{proxy_prefix}{original_url}"
-        
-    return original_url
+    group_name, rest = _match_group(original_url)
+    if not group_name:
+        return original_url
+
+    _samples[group_name] = original_url
+    mirror = best_mirror(group_name)
+    if not mirror:
+        return original_url
+    return mirror + original_url[rest:]
+
+
+async def _probe(client: httpx.AsyncClient, mirror: str, url: str):
+    started = time.perf_counter()
+    received = 0
+    try:
+        async with client.stream("GET", url, headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"}) as resp:
+            if resp.status_code not in (200, 206):
+                raise httpx.HTTPStatusError(f"HTTP {resp.status_code}", request=resp.request, response=resp)
+            latency = time.perf_counter() - started
+            # Servers that ignore Range would send the whole installer; stop at the window
+            async for chunk in resp.aiter_bytes():
+                received += len(chunk)
+                if received >= PROBE_BYTES:
+                    break
+        if not received:
+            raise ValueError("empty response")
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        _record(mirror, latency=latency, throughput=received / elapsed)
+    except Exception as e:
+        _record(mirror, error=str(e) or type(e).__name__)
+
+
+def _record(mirror: str, latency: float = None, throughput: float = None, error: str = None):
+    score = _scores.get(mirror)
+    now = time.time()
+    if error:
+        failures = (score["failures"] if score else 0) + 1
+        # Below the threshold a mirror keeps its state (and its averages)
+        healthy = failures < UNHEALTHY_AFTER_FAILURES and (score is None or score["healthy"])
+        _scores[mirror] = {
+            **(score or {"latency": None, "throughput": 0.0}),
+            "healthy": healthy,
+            "failures": failures,
+            "last_probe": now,
+            "error": error,
+        }
+        return
+
+    if score and score["healthy"] and score["throughput"]:
+        latency = SCORE_ALPHA * latency + (1 - SCORE_ALPHA) * score["latency"]
+        throughput = SCORE_ALPHA * throughput + (1 - SCORE_ALPHA) * score["throughput"]
+    _scores[mirror] = {
+        "healthy": True,
+        "latency": latency,
+        "throughput": throughput,
+        "failures": 0,
+        "last_probe": now,
+        "error": None,
+    }
+
+
+async def probe_mirrors():
+    """
+    Measures every configured mirror with a small range request against the
+    latest real download URL seen for its group (or the group's probe file).
+    """
+    jobs = []
+    async with httpx.AsyncClient(follow_redirects=True, timeout=PROBE_TIMEOUT) as client:
+        for name, group in MIRROR_GROUPS.items():
+            sample = _samples.get(name) or group["probe"]
+            rest = _match_group(sample)[1]
+            for mirror in group["mirrors"]:
+                jobs.append(_probe(client, mirror, mirror + sample[rest:]))
+        await asyncio.gather(*jobs)
+
+    healthy = sum(1 for s in _scores.values() if s["healthy"])
+    print(f"Mirror probe finished: {healthy}/{len(_scores)} mirrors healthy.")
+
+
+def export_scores() -> dict:
+    return dict(_scores)
+
+
+def load_scores(scores: dict):
+    """Replaces local scores with ones measured elsewhere (e.g. by the leader worker)."""
+    _scores.clear()
+    _scores.update(scores)
+
+
+def mirror_status() -> dict:
+    """Current scores per group, best mirror first."""
+    status = {}
+    for name, group in MIRROR_GROUPS.items():
+        status[name] = {
+            "selected": best_mirror(name),
+            "mirrors": [
+                {"mirror": m, **_scores.get(m, {"healthy": None})}
+                for m in sorted(group["mirrors"], key=_rank)
+            ],
+        }
+    return status
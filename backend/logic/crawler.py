@@ -1,10 +1,17 @@
 import asyncio
 import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Optional
 import httpx
 from bs4 import BeautifulSoup
 from .accelerator import get_smart_link
+from .download_cache import prefetch, PREFETCH_ENABLED
 from sqlmodel import Session, select
-from models import Tool
+from models import Tool, CrawlHistory
 
 # Common headers to mimic a browser
 HEADERS = {
@@ -13,200 +20,150 @@ HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
-async def fetch_vscode():
-    try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            resp = await client.get("https://update.code.visualstudio.com/api/update/win32-x64-user/stable/latest", headers=HEADERS)
-            if resp.status_code == 200:
-                data = resp.json()
-                version = data.get("name", "Latest")
-                url = data.get("url")
-                return {
-                    "name": "VS Code",
-                    "category": "Programming",
-                    "version": version,
-                    "homepage_url": "https://code.visualstudio.com/",
-                    "original_download_url": url,
-                    "versions": [
-                        {"version": f"Stable ({version})", "url": url}
-                    ]
-                }
-    except Exception as e:
-        print(f"Error fetching VS Code: {e}")
-    return None
+# Each fetcher gets this long before its result is dropped for this run
+FETCHER_TIMEOUT_SECONDS = float(os.environ.get("CRAWL_FETCHER_TIMEOUT", "30"))
 
-async def fetch_git():
-    try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            resp = await client.get("https://api.github.com/repos/git-for-windows/git/releases/latest", headers=HEADERS)
-            if resp.status_code == 200:
-                data = resp.json()
-                version = data.get("tag_name", "").replace("v", "")
-                original_url = ""
-                for asset in data.get("assets", []):
-                    if asset["name"].endswith("64-bit.exe") and "busybox" not in asset["name"]:
-                        original_url = asset["browser_download_url"]
-                        break
-                
-                return {
-                    "name": "Git",
-                    "category": "Programming",
-                    "version": version,
-                    "homepage_url": "https://git-scm.com/",
-                    "original_download_url": original_url or "https://git-scm.com/download/win"
-                }
-    except Exception as e:
-        print(f"Error fetching Git: {e}")
-    return None
+GITHUB_GRAPHQL_URL = "https://api.github.com/graphql"
+# Repositories resolved per GraphQL request; keeps each query well under GitHub's node limits
+GITHUB_BATCH_SIZE = 50
+
+# Fetchers return a tool dict (or a list of them) and raise on failure, so the
+# crawl history records why a source produced nothing.
+
+async def fetch_vscode():
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        resp = await client.get("https://update.code.visualstudio.com/api/update/win32-x64-user/stable/latest", headers=HEADERS)
+        resp.raise_for_status()
+        data = resp.json()
+        version = data.get("name", "Latest")
+        url = data.get("url")
+        return {
+            "name": "VS Code",
+            "category": "Programming",
+            "version": version,
+            "homepage_url": "https://code.visualstudio.com/",
+            "original_download_url": url,
+            "versions": [
+                {"version": f"Stable ({version})", "url": url}
+            ]
+        }
 
 async def fetch_nodejs():
-    try:
-        print("Fetching Node.js...")
-        async with httpx.AsyncClient(follow_redirects=True, verify=False) as client:
-            resp = await client.get("https://nodejs.org/dist/index.json", headers=HEADERS)
-            if resp.status_code == 200:
-                data = resp.json()
-                
-                versions_list = []
-                
-                # Get Top 5 LTS
-                lts_versions = [v for v in data if v["lts"]][:5]
-                for v in lts_versions:
-                    ver = v["version"].lstrip("v")
-                    versions_list.append({
-                        "version": f"v{ver}",
-                        "url": f"https://nodejs.org/dist/v{ver}/node-v{ver}-x64.msi",
-                        "group": "LTS"
-                    })
-
-                # Get Top 5 Current (non-LTS)
-                current_versions = [v for v in data if not v["lts"]][:5]
-                for v in current_versions:
-                    ver = v["version"].lstrip("v")
-                    versions_list.append({
-                        "version": f"v{ver}",
-                        "url": f"https://nodejs.org/dist/v{ver}/node-v{ver}-x64.msi",
-                        "group": "Current"
-                    })
-                
-                # Primary is latest LTS
-                primary_version = lts_versions[0]["version"].lstrip("v") if lts_versions else "Latest"
-                primary_url = f"https://nodejs.org/dist/v{primary_version}/node-v{primary_version}-x64.msi"
-
-                print(f"Node.js versions fetched: {len(versions_list)}")
-                return {
-                    "name": "Node.js",
-                    "category": "Programming",
-                    "version": primary_version,
-                    "homepage_url": "https://nodejs.org/",
-                    "original_download_url": primary_url,
-                    "versions": versions_list
-                }
-            else:
-                print(f"Node.js fetch failed: {resp.status_code}")
-    except Exception as e:
-        print(f"Error fetching Node.js: {e}")
-    return None
+    print("Fetching Node.js...")
+    async with httpx.AsyncClient(follow_redirects=True, verify=False) as client:
+        resp = await client.get("https://nodejs.org/dist/index.json", headers=HEADERS)
+        resp.raise_for_status()
+        data = resp.json()
+
+        versions_list = []
+
+        # Get Top 5 LTS
+        lts_versions = [v for v in data if v["lts"]][:5]
+        for v in lts_versions:
+            ver = v["version"].lstrip("v")
+            versions_list.append({
+                "version": f"v{ver}",
+                "url": f"https://nodejs.org/dist/v{ver}/node-v{ver}-x64.msi",
+                "group": "LTS"
+            })
+
+        # Get Top 5 Current (non-LTS)
+        current_versions = [v for v in data if not v["lts"]][:5]
+        for v in current_versions:
+            ver = v["version"].lstrip("v")
+            versions_list.append({
+                "version": f"v{ver}",
+                "url": f"https://nodejs.org/dist/v{ver}/node-v{ver}-x64.msi",
+                "group": "Current"
+            })
+
+        # Primary is latest LTS
+        primary_version = lts_versions[0]["version"].lstrip("v") if lts_versions else "Latest"
+        primary_url = f"https://nodejs.org/dist/v{primary_version}/node-v{primary_version}-x64.msi"
+
+        print(f"Node.js versions fetched: {len(versions_list)}")
+        return {
+            "name": "Node.js",
+            "category": "Programming",
+            "version": primary_version,
+            "homepage_url": "https://nodejs.org/",
+            "original_download_url": primary_url,
+            "versions": versions_list
+        }
 
 async def fetch_python():
-    try:
-        print("Fetching Python...")
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            resp = await client.get("https://www.python.org/downloads/windows/", headers=HEADERS)
-            
-            if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                
-                # Find all "Stable Releases"
-                # They are usually under a header "Python Releases for Windows" -> "Stable Releases"
-                # But simple heuristic: Find links with text "Download Windows installer (64-bit)"
-                # And look at their parent/preceding text for version.
-                
-                versions_list = []
-                seen_versions = set()
-                
-                # Find all links that look like installers
-                links = soup.find_all("a", string=lambda t: t and "installer (64-bit)" in t)
-                
-                for link in links:
-                    href = link.get("href")
-                    if "amd64.exe" in href:
-                        # Extract version from URL: /ftp/python/3.12.1/python-3.12.1-amd64.exe
-                        try:
-                            ver = href.split("python-")[1].split("-amd64")[0] # 3.12.1
-                            major_minor = ".".join(ver.split(".")[:2]) # 3.12
-                            
-                            if major_minor not in seen_versions:
-                                versions_list.append({
-                                    "version": ver,
-                                    "url": href
-                                })
-                                seen_versions.add(major_minor)
-                                
-                            if len(versions_list) >= 2:
-                                break
-                        except:
-                            continue
-
-                if not versions_list:
-                    # Fallback to strategy 1 if list is empty
-                    version_elem = soup.find("a", string=lambda t: t and "Latest Python 3 Release" in t)
-                    if version_elem:
-                        version_text = version_elem.get_text()
-                        version = version_text.split("-")[-1].strip().replace("Python ", "")
-                        url = f"https://www.python.org/ftp/python/{version}/python-{version}-amd64.exe"
-                        versions_list.append({"version": version, "url": url})
-                
-                if versions_list:
-                    primary = versions_list[0]
-                    print(f"Python versions found: {[v['version'] for v in versions_list]}")
-                    return {
-                        "name": "Python",
-                        "category": "Programming",
-                        "version": primary["version"],
-                        "homepage_url": "https://www.python.org/",
-                        "original_download_url": primary["url"],
-                        "versions": versions_list
-                    }
-    except Exception as e:
-        print(f"Error fetching Python: {e}")
-    return None
+    print("Fetching Python...")
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        resp = await client.get("https://www.python.org/downloads/windows/", headers=HEADERS)
+        resp.raise_for_status()
+        soup = BeautifulSoup(resp.text, 'html.parser')
 
-async def fetch_vlc():
-    try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            resp = await client.get("http://update.videolan.org/vlc/status-win-x64", headers=HEADERS)
-            if resp.status_code == 200:
-                version = resp.text.splitlines()[0].strip()
-                return {
-                    "name": "VLC Media Player",
-                    "category": "Media",
-                    "version": version,
-                    "homepage_url": "https://www.videolan.org/vlc/",
-                    "original_download_url": f"https://get.videolan.org/vlc/{version}/win64/vlc-{version}-win64.exe"
-                }
-    except Exception as e:
-        print(f"Error fetching VLC: {e}")
-    return None
+        # Find all "Stable Releases"
+        # They are usually under a header "Python Releases for Windows" -> "Stable Releases"
+        # But simple heuristic: Find links with text "Download Windows installer (64-bit)"
+        # And look at their parent/preceding text for version.
 
-async def fetch_obs():
-    try:
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            resp = await client.get("https://api.github.com/repos/obsproject/obs-studio/releases/latest", headers=HEADERS)
-            if resp.status_code == 200:
-                data = resp.json()
-                version = data.get("tag_name", "Latest").replace("release/","").strip()
-                original_url = next((asset["browser_download_url"] for asset in data.get("assets", []) if asset["name"].endswith("Full-Installer-x64.exe")), "")
-                return {
-                    "name": "OBS Studio",
-                    "category": "Media",
-                    "version": version,
-                    "homepage_url": "https://obsproject.com/",
-                    "original_download_url": original_url
-                }
-    except Exception as e:
-        print(f"Error fetching OBS: {e}")
-    return None
+        versions_list = []
+        seen_versions = set()
+
+        # Find all links that look like installers
+        links = soup.find_all("a", string=lambda t: t and "installer (64-bit)" in t)
+
+        for link in links:
+            href = link.get("href")
+            if "amd64.exe" in href:
+                # Extract version from URL: /ftp/python/3.12.1/python-3.12.1-amd64.exe
+                try:
+                    ver = href.split("python-")[1].split("-amd64")[0] # 3.12.1
+                    major_minor = ".".join(ver.split(".")[:2]) # 3.12
+
+                    if major_minor not in seen_versions:
+                        versions_list.append({
+                            "version": ver,
+                            "url": href
+                        })
+                        seen_versions.add(major_minor)
+
+                    if len(versions_list) >= 2:
+                        break
+                except:
+                    continue
+
+        if not versions_list:
+            # Fallback to strategy 1 if list is empty
+            version_elem = soup.find("a", string=lambda t: t and "Latest Python 3 Release" in t)
+            if version_elem:
+                version_text = version_elem.get_text()
+                version = version_text.split("-")[-1].strip().replace("Python ", "")
+                url = f"https://www.python.org/ftp/python/{version}/python-{version}-amd64.exe"
+                versions_list.append({"version": version, "url": url})
+
+        if versions_list:
+            primary = versions_list[0]
+            print(f"Python versions found: {[v['version'] for v in versions_list]}")
+            return {
+                "name": "Python",
+                "category": "Programming",
+                "version": primary["version"],
+                "homepage_url": "https://www.python.org/",
+                "original_download_url": primary["url"],
+                "versions": versions_list
+            }
+
+    raise ValueError("no Windows installers found on the downloads page")
+
+async def fetch_vlc():
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        resp = await client.get("http://update.videolan.org/vlc/status-win-x64", headers=HEADERS)
+        resp.raise_for_status()
+        version = resp.text.splitlines()[0].strip()
+        return {
+            "name": "VLC Media Player",
+            "category": "Media",
+            "version": version,
+            "homepage_url": "https://www.videolan.org/vlc/",
+            "original_download_url": f"https://get.videolan.org/vlc/{version}/win64/vlc-{version}-win64.exe"
+        }
 
 async def fetch_steam():
     return {
@@ -217,18 +174,190 @@ async def fetch_steam():
         "original_download_url": "https://cdn.akamai.steamstatic.com/client/installer/SteamSetup.exe"
     }
 
+def build_github_tool(app: dict, tag_name: str, assets: list) -> dict:
+    """
+    Turns a GitHub release into a tool entry using the app's "github_release" config:
+    - repo: "owner/name"
+    - asset_pattern: regex matched against asset file names
+    - tag_prefix (optional): stripped from the tag to get the version
+    - fallback_url (optional): used when no asset matches
+    """
+    spec = app["github_release"]
+    version = tag_name.strip()
+    if spec.get("tag_prefix"):
+        version = version.removeprefix(spec["tag_prefix"])
+
+    pattern = re.compile(spec["asset_pattern"])
+    original_url = next((a["url"] for a in assets if pattern.search(a["name"])), "")
+
+    return {
+        "name": app["name"],
+        "category": app.get("category", "Programming"),
+        "version": version or "Latest",
+        "homepage_url": app["homepage_url"],
+        "original_download_url": original_url or spec.get("fallback_url", "")
+    }
+
+async def _fetch_github_release_rest(client: httpx.AsyncClient, app: dict):
+    repo = app["github_release"]["repo"]
+    resp = await client.get(f"https://api.github.com/repos/{repo}/releases/latest", headers=HEADERS)
+    resp.raise_for_status()
+    data = resp.json()
+    assets = [{"name": a["name"], "url": a["browser_download_url"]} for a in data.get("assets", [])]
+    return build_github_tool(app, data.get("tag_name", ""), assets)
+
+async def _fetch_github_release_batch(client: httpx.AsyncClient, apps: list, token: str) -> list:
+    fields = []
+    for i, app in enumerate(apps):
+        owner, name = app["github_release"]["repo"].split("/", 1)
+        fields.append(
+            f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{"
+            " latestRelease { tagName releaseAssets(first: 100) { nodes { name downloadUrl } } } }"
+        )
+    query = "query { " + " ".join(fields) + " }"
+
+    resp = await client.post(
+        GITHUB_GRAPHQL_URL,
+        json={"query": query},
+        headers={**HEADERS, "Authorization": f"Bearer {token}"}
+    )
+    resp.raise_for_status()
+    payload = resp.json()
+
+    errors = [error.get("message") for error in payload.get("errors") or []]
+    for message in errors:
+        print(f"GitHub GraphQL error: {message}")
+    data = payload.get("data") or {}
+    if errors and not any(data.values()):
+        raise ValueError(f"GitHub GraphQL: {errors[0]}")
+
+    results = []
+    for i, app in enumerate(apps):
+        release = (data.get(f"r{i}") or {}).get("latestRelease")
+        if not release:
+            continue
+        assets = [{"name": a["name"], "url": a["downloadUrl"]} for a in release["releaseAssets"]["nodes"]]
+        results.append(build_github_tool(app, release["tagName"], assets))
+    return results
+
+async def fetch_github_releases(apps: list) -> list:
+    """
+    Resolves the latest release of every GitHub-hosted app in as few API calls as possible.
+
+    With GITHUB_TOKEN set, repositories are combined into GraphQL queries of
+    GITHUB_BATCH_SIZE each. GitHub's GraphQL API rejects anonymous requests, so
+    without a token this falls back to one REST call per repository.
+    Individual failures are logged; it only raises when every call failed.
+    """
+    token = os.environ.get("GITHUB_TOKEN")
+    async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
+        if token:
+            batches = [apps[i:i + GITHUB_BATCH_SIZE] for i in range(0, len(apps), GITHUB_BATCH_SIZE)]
+            calls = [_fetch_github_release_batch(client, batch, token) for batch in batches]
+        else:
+            calls = [_fetch_github_release_rest(client, app) for app in apps]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    for error in errors:
+        print(f"Error fetching GitHub releases: {error}")
+    if errors and len(errors) == len(results):
+        raise errors[0]
+    results = [r for r in results if not isinstance(r, BaseException)]
+    if token:
+        return [tool for batch in results for tool in batch]
+    return [r for r in results if r]
+
 # Map string names to functions
 FETCHER_MAP = {
     "fetch_vscode": fetch_vscode,
-    "fetch_git": fetch_git,
     "fetch_nodejs": fetch_nodejs,
     "fetch_python": fetch_python,
     "fetch_vlc": fetch_vlc,
-    "fetch_obs": fetch_obs,
     "fetch_steam": fetch_steam
 }
 
-async def crawl_tools(session: Session):
+def _save_tool(session: Session, data: dict) -> bool:
+    """Upserts one crawled tool; returns True when its version changed."""
+    smart_url = get_smart_link(data["original_download_url"])
+    versions_json = json.dumps(data.get("versions", [])) if data.get("versions") else None
+
+    statement = select(Tool).where(Tool.name == data["name"])
+    existing_tool = session.exec(statement).first()
+    version_changed = not existing_tool or existing_tool.version != data["version"]
+
+    if not existing_tool:
+        tool = Tool(
+            name=data["name"],
+            category=data["category"], 
+            version=data["version"],
+            homepage_url=data["homepage_url"],
+            original_download_url=data["original_download_url"],
+            smart_download_url=smart_url,
+            versions_json=versions_json
+        )
+        session.add(tool)
+    else:
+        existing_tool.category = data["category"]
+        existing_tool.version = data["version"]
+        existing_tool.original_download_url = data["original_download_url"]
+        existing_tool.smart_download_url = smart_url
+        existing_tool.versions_json = versions_json
+        session.add(existing_tool)
+    session.commit()
+    return version_changed
+
+def _save_results(session: Session, tools_data: list) -> tuple[set, list, Optional[str]]:
+    """
+    Saves one fetcher's tools, each in its own commit. Returns the saved
+    names, the download URLs whose version changed and the last save error.
+    """
+    saved, changed_urls, error = set(), [], None
+    for data in tools_data:
+        try:
+            version_changed = _save_tool(session, data)
+        except Exception as e:
+            session.rollback()
+            print(f"Failed to save {data.get('name')}: {e}")
+            error = f"saving {data.get('name')}: {e}"
+            continue
+        saved.add(data["name"])
+        if version_changed:
+            changed_urls.append(data["original_download_url"])
+    return saved, changed_urls, error
+
+def _record_history(session: Session, entry: CrawlHistory) -> CrawlHistory:
+    session.add(entry)
+    session.commit()
+    session.refresh(entry)
+    return entry
+
+async def _run_fetcher(name: str, coro):
+    """Runs one fetcher under its deadline; never raises."""
+    started_at = datetime.now().isoformat(timespec="seconds")
+    started = time.perf_counter()
+    result, outcome, error = None, "ok", None
+    try:
+        result = await asyncio.wait_for(coro, FETCHER_TIMEOUT_SECONDS)
+        if not result:
+            outcome = "empty"
+    except asyncio.TimeoutError:
+        outcome, error = "timeout", f"no result after {FETCHER_TIMEOUT_SECONDS:g}s"
+    except Exception as e:
+        # httpx appends a help link on a second line
+        outcome, error = "error", (str(e) or type(e).__name__).splitlines()[0]
+    return name, started_at, time.perf_counter() - started, result, outcome, error
+
+async def crawl_tools(session: Session, on_tools_saved: Optional[Callable[[set], None]] = None) -> list:
+    """
+    Runs every fetcher concurrently and saves each result as soon as its
+    fetcher finishes, so a slow or hanging upstream only delays its own
+    tools. Each tool is committed on its own; the names saved from one
+    fetcher are then reported together through `on_tools_saved(names)`.
+    Database work and `on_tools_saved` run in worker threads, one at a time.
+    Every fetcher's timing and outcome is recorded in CrawlHistory.
+    Returns the history rows of this run.
+    """
     print("Starting crawler...")
     
     # Load apps from config
@@ -238,51 +367,52 @@ async def crawl_tools(session: Session):
             apps_config = json.load(f)
     except Exception as e:
         print(f"Failed to load apps.json: {e}")
-        return
+        return []
 
-    tasks = []
+    jobs = []
+    github_apps = []
     for app in apps_config:
         fetcher_name = app.get("fetcher")
-        if fetcher_name and fetcher_name in FETCHER_MAP:
-            tasks.append(FETCHER_MAP[fetcher_name]())
-        # else:
-            # print(f"No fetcher found for {app.get('name')}")
+        if app.get("github_release"):
+            github_apps.append(app)
+        elif fetcher_name and fetcher_name in FETCHER_MAP:
+            jobs.append(_run_fetcher(fetcher_name, FETCHER_MAP[fetcher_name]()))
+
+    if github_apps:
+        jobs.append(_run_fetcher("github_releases", fetch_github_releases(github_apps)))
     
-    if not tasks:
+    if not jobs:
         print("No tasks to run.")
-        return
+        return []
 
-    results = await asyncio.gather(*tasks)
-    tools_data = [r for r in results if r]
-    
-    print(f"Fetched {len(tools_data)} tools successfully.")
+    run_id = uuid.uuid4().hex[:12]
+    history = []
+    for finished in asyncio.as_completed(jobs):
+        name, started_at, elapsed, result, outcome, error = await finished
+        # Batched fetchers return a list of tools
+        tools_data = result if isinstance(result, list) else [result] if result else []
 
-    # Save to DB
-    for data in tools_data:
-        smart_url = get_smart_link(data["original_download_url"])
-        versions_json = json.dumps(data.get("versions", [])) if data.get("versions") else None
-        
-        statement = select(Tool).where(Tool.name == data["name"])
-        existing_tool = session.exec(statement).first()
-        
-        if not existing_tool:
-            tool = Tool(
-                name=data["name"],
-                category=data["category"], 
-                version=data["version"],
-                homepage_url=data["homepage_url"],
-                original_download_url=data["original_download_url"],
-                smart_download_url=smart_url,
-                versions_json=versions_json
-            )
-            session.add(tool)
-        else:
-            existing_tool.category = data["category"]
-            existing_tool.version = data["version"]
-            existing_tool.original_download_url = data["original_download_url"]
-            existing_tool.smart_download_url = smart_url
-            existing_tool.versions_json = versions_json
-            session.add(existing_tool)
-        
-    session.commit()
-    print(f"Crawler finished. Database updated.")
\ No newline at end of file
+        # Commits and the catalog rebuild are blocking; keep them off the event loop
+        saved, changed_urls, save_error = await asyncio.to_thread(_save_results, session, tools_data)
+        if save_error:
+            outcome, error = "error", save_error
+        if PREFETCH_ENABLED:
+            for url in changed_urls:
+                prefetch(url)
+        if saved and on_tools_saved:
+            await asyncio.to_thread(on_tools_saved, saved)
+
+        entry = await asyncio.to_thread(_record_history, session, CrawlHistory(
+            run_id=run_id,
+            fetcher=name,
+            started_at=started_at,
+            duration_ms=round(elapsed * 1000),
+            outcome=outcome,
+            tools=len(saved),
+            error=error,
+        ))
+        history.append(entry)
+        print(f"Fetcher {name}: {outcome}, {len(saved)} tools in {elapsed:.1f}s" + (f" ({error})" if error else ""))
+
+    print(f"Crawler finished: {sum(h.tools for h in history)} tools updated.")
+    return history
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+from urllib.parse import urlparse, unquote
+
+import httpx
+from .accelerator import get_smart_link
+
+CACHE_DIR = os.environ.get("DOWNLOAD_CACHE_DIR", "cache/downloads")
+CACHE_MAX_BYTES = int(os.environ.get("DOWNLOAD_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))
+# Set DOWNLOAD_PREFETCH=1 to warm the cache as soon as the crawler finds a new version
+PREFETCH_ENABLED = os.environ.get("DOWNLOAD_PREFETCH") == "1"
+CHUNK_SIZE = 256 * 1024
+
+# cache key -> CacheFill for downloads this worker is pulling from upstream.
+# Other workers may fetch the same file at the same time; each writes its own
+# part file and the finished copies replace each other atomically.
+_inflight = {}
+# Part files older than this are left over from a crashed worker
+STALE_PART_SECONDS = 24 * 3600
+
+
+def cache_key(original_url: str) -> str:
+    # Keyed on the origin URL so a mirror switch does not invalidate the cache
+    return hashlib.sha256(original_url.encode("utf-8")).hexdigest()
+
+
+def _paths(key: str):
+    base = os.path.join(CACHE_DIR, key)
+    return base, base + ".json", f"{base}.{os.getpid()}.part"
+
+
+def load_cached(original_url: str) -> Optional[dict]:
+    """Returns the metadata of a completed cache entry (touching it for LRU), or None."""
+    path, meta_path, _ = _paths(cache_key(original_url))
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        os.utime(path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    meta["path"] = path
+    return meta
+
+
+class CacheFill:
+    """
+    A single upstream download being written into the cache. Any number of
+    readers can follow it while it is still in progress.
+    """
+
+    def __init__(self, original_url: str):
+        self.original_url = original_url
+        self.key = cache_key(original_url)
+        self.path, self.meta_path, self.part_path = _paths(self.key)
+        self.meta = None
+        self.written = 0
+        self.done = False
+        self.error = None
+        self.ready = asyncio.Event()
+        self.progress = asyncio.Condition()
+        self.task = None
+
+    async def _notify(self):
+        async with self.progress:
+            self.progress.notify_all()
+
+    async def run(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        smart_url = get_smart_link(self.original_url)
+        sources = [smart_url] if smart_url == self.original_url else [smart_url, self.original_url]
+        try:
+            for i, source in enumerate(sources):
+                try:
+                    await self._download(source)
+                    break
+                except Exception as e:
+                    # Only fall back to the origin if nothing was handed to readers yet
+                    if self.written or i == len(sources) - 1:
+                        raise
+                    print(f"Mirror download failed ({source}): {e}, retrying origin")
+
+            os.replace(self.part_path, self.path)
+            meta_tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+            with open(meta_tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f)
+            os.replace(meta_tmp_path, self.meta_path)
+            evict(keep=self.key)
+        except Exception as e:
+            print(f"Download cache fill failed for {self.original_url}: {e}")
+            self.error = str(e) or type(e).__name__
+            if os.path.exists(self.part_path):
+                os.unlink(self.part_path)
+        finally:
+            self.done = True
+            self.ready.set()
+            _inflight.pop(self.key, None)
+            await self._notify()
+
+    async def _download(self, source: str):
+        # Identity encoding keeps Content-Length equal to the bytes we store
+        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
+            async with client.stream("GET", source, headers={"Accept-Encoding": "identity"}) as resp:
+                resp.raise_for_status()
+                length = resp.headers.get("content-length")
+                self.meta = {
+                    "url": self.original_url,
+                    "filename": _filename(resp),
+                    "content_type": resp.headers.get("content-type", "application/octet-stream"),
+                    "size": int(length) if length and length.isdigit() else None,
+                }
+
+                with open(self.part_path, "wb") as f:
+                    async for chunk in resp.aiter_raw(CHUNK_SIZE):
+                        f.write(chunk)
+                        f.flush()
+                        self.written += len(chunk)
+                        # Readers are released on the first byte, once the source is committed to
+                        self.ready.set()
+                        await self._notify()
+        self.meta["size"] = self.written
+        self.meta["etag"] = f'"{self.key[:32]}-{self.written}"'
+
+    def follow(self):
+        """
+        Returns an iterator over the download from the start, waiting for new
+        bytes until the fill completes. Call once `ready` is set and the fill
+        is not done yet; the part file is opened immediately so the final
+        rename cannot race the reader.
+        """
+        return self._follow(open(self.part_path, "rb"))
+
+    async def _follow(self, f):
+        position = 0
+        with f:
+            while True:
+                if position < self.written:
+                    chunk = f.read(min(CHUNK_SIZE, self.written - position))
+                    position += len(chunk)
+                    yield chunk
+                    continue
+                if self.error:
+                    raise RuntimeError(self.error)
+                if self.done:
+                    return
+                async with self.progress:
+                    await self.progress.wait_for(lambda: self.written > position or self.done)
+
+
+def _filename(resp: httpx.Response) -> str:
+    disposition = resp.headers.get("content-disposition", "")
+    if "filename=" in disposition:
+        return disposition.split("filename=", 1)[1].split(";", 1)[0].strip().strip('"')
+    return unquote(os.path.basename(urlparse(str(resp.url)).path)) or "download"
+
+
+def start_fill(original_url: str) -> CacheFill:
+    """Starts (or joins) the upstream fetch for a URL; concurrent callers share one download."""
+    key = cache_key(original_url)
+    fill = _inflight.get(key)
+    if fill is None:
+        fill = CacheFill(original_url)
+        _inflight[key] = fill
+        fill.task = asyncio.create_task(fill.run())
+    return fill
+
+
+def prefetch(original_url: str):
+    if not original_url or load_cached(original_url) or cache_key(original_url) in _inflight:
+        return
+    print(f"Prefetching {original_url} into download cache")
+    start_fill(original_url)
+
+
+def evict(keep: Optional[str] = None):
+    """
+    Drops least recently used entries until the cache fits in CACHE_MAX_BYTES.
+    The entry `keep` (the one just filled) is never dropped, even when it
+    alone is larger than the limit. Stale part files are removed too.
+    """
+    entries = []
+    total = 0
+    now = time.time()
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if name.endswith((".part", ".tmp")):
+            if now - stat.st_mtime > STALE_PART_SECONDS:
+                os.unlink(path)
+            continue
+        if "." in name:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+        total += stat.st_size
+
+    for _, size, name in sorted(entries):
+        if total <= CACHE_MAX_BYTES:
+            break
+        if name == keep:
+            continue
+        path, meta_path, _ = _paths(name)
+        for p in (meta_path, path):
+            if os.path.exists(p):
+                os.unlink(p)
+        total -= size
+        print(f"Evicted {name} from download cache")
+
+
+def cache_stats() -> dict:
+    files = [n for n in os.listdir(CACHE_DIR) if "." not in n] if os.path.isdir(CACHE_DIR) else []
+    return {
+        "entries": len(files),
+        "bytes": sum(os.path.getsize(os.path.join(CACHE_DIR, n)) for n in files),
+        "max_bytes": CACHE_MAX_BYTES,
+        "in_progress": [f.original_url for f in _inflight.values()],
+    }
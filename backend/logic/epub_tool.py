@@ -1,84 +1,120 @@
-import ebooklib
-from ebooklib import epub
-from bs4 import BeautifulSoup
-import io
+import html
 import re
+import shutil
+import zipfile
+from xml.sax.saxutils import escape
+from .glossary import GlossaryMatcher
 
-def replace_terms_in_epub(epub_bytes: bytes, glossary: dict) -> tuple[bytes, int]:
+# EPUB content documents; everything else in the archive is copied untouched
+DOCUMENT_EXTENSIONS = (".xhtml", ".html", ".htm")
+
+# Markup tokens. Whatever lies between two of them is a text node. Tags may
+# contain ">" inside quoted attribute values.
+MARKUP_TOKEN = re.compile(
+    r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<\?.*?\?>|<![^>]*>|<(?:[^>\"']|\"[^\"]*\"|'[^']*')*>",
+    re.S,
+)
+RAW_TEXT_START = re.compile(r"<(script|style)\b[^>]*?(/?)>\Z", re.I)
+
+
+def _rewrite_text(text: str, matcher: GlossaryMatcher) -> tuple[str, int]:
+    # Terms are matched against the decoded text, so "&amp;" or "&#8217;" in
+    # the source matches "&" or "’" in a term. Only changed nodes are re-escaped.
+    decoded = html.unescape(text) if "&" in text else text
+    new_text, count = matcher.sub(decoded)
+    if not count:
+        return text, 0
+    return escape(new_text), count
+
+
+def rewrite_text_nodes(document: str, matcher: GlossaryMatcher) -> tuple[str, int]:
+    """
+    Applies the matcher to text content only, outside <script>/<style>.
+    Markup (tags, attributes, comments) is copied verbatim, and text nodes
+    without a match keep their original bytes, entities included.
+    """
+    out = []
+    total = 0
+    position = 0
+    raw_text_end = None  # closing tag we're waiting for inside script/style
+
+    for token in MARKUP_TOKEN.finditer(document):
+        start = token.start()
+        if start > position:
+            text = document[position:start]
+            if raw_text_end is None:
+                text, count = _rewrite_text(text, matcher)
+                total += count
+            out.append(text)
+
+        tag = token.group(0)
+        if raw_text_end is not None:
+            if tag.lower().startswith(raw_text_end):
+                raw_text_end = None
+        else:
+            raw_start = RAW_TEXT_START.match(tag)
+            if raw_start and not raw_start.group(2):
+                raw_text_end = f"</{raw_start.group(1).lower()}"
+        out.append(tag)
+        position = token.end()
+
+    tail = document[position:]
+    if tail and raw_text_end is None:
+        tail, count = _rewrite_text(tail, matcher)
+        total += count
+    out.append(tail)
+    return "".join(out), total
+
+
+def rewrite_document(content: bytes, matcher: GlossaryMatcher) -> tuple[bytes, int]:
     """
-    Replaces terms in an EPUB file based on a glossary dictionary.
+    Returns the document with its text nodes rewritten, or the original bytes
+    unchanged when nothing matched.
+    """
+    try:
+        document = content.decode("utf-8")
+    except UnicodeDecodeError:
+        # EPUB requires UTF-8 (or UTF-16, which we leave alone)
+        return content, 0
+
+    # Cheap pre-scan over the whole document: most chapters have no hits at all
+    if not matcher.search(html.unescape(document) if "&" in document else document):
+        return content, 0
+
+    new_document, count = rewrite_text_nodes(document, matcher)
+    if not count:
+        return content, 0
+    return new_document.encode("utf-8"), count
+
+
+def replace_terms_in_epub(epub_path: str, output_path: str, matcher: GlossaryMatcher) -> int:
+    """
+    Replaces terms in an EPUB file based on a compiled glossary.
+
+    The archive is rewritten entry by entry in its original order (so the
+    stored "mimetype" entry stays first); only the text content of XHTML
+    documents changes, every other byte is preserved. Non-document entries
+    are streamed, so memory use is bounded by the largest chapter.
     
     Args:
-        epub_bytes: The binary content of the EPUB file.
-        glossary: A dictionary where keys are terms to find and values are replacements.
+        epub_path: Path of the source EPUB.
+        output_path: Where to write the modified EPUB.
+        matcher: The glossary compiled by GlossaryMatcher.from_glossary (or loaded from the store).
         
     Returns:
-        A tuple containing:
-        - The binary content of the modified EPUB file.
-        - The total number of replacements made.
+        The total number of replacements made.
     """
-    
-    # Load EPUB from bytes
-    input_io = io.BytesIO(epub_bytes)
     total_replacements = 0
-    
-    import tempfile
-    import os
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".epub") as tmp_in:
-        tmp_in.write(epub_bytes)
-        tmp_in_path = tmp_in.name
-        
-    try:
-        book = epub.read_epub(tmp_in_path)
-        
-        # Sort glossary by length of keys descending to avoid partial replacement issues
-        sorted_glossary = dict(sorted(glossary.items(), key=lambda item: len(item[0]), reverse=True))
-        
-        for item in book.get_items():
-            if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                # This is an HTML/XHTML file
-                soup = BeautifulSoup(item.get_content(), 'html.parser')
-                
-                # We only want to replace text in text nodes, not attributes or tags
-                for text_node in soup.find_all(string=True):
-                    if text_node.parent.name in ['script', 'style']:
-                        continue
-                        
-                    original_text = text_node.string
-                    if not original_text:
-                        continue
-                        
-                    new_text = original_text
-                    modified = False
-                    
-                    for term, replacement in sorted_glossary.items():
-                        if term in new_text:
-                            count = new_text.count(term)
-                            if count > 0:
-                                new_text = new_text.replace(term, replacement)
-                                total_replacements += count
-                                modified = True
-                            
-                    if modified:
-                        text_node.replace_with(new_text)
-                        
-                item.set_content(str(soup).encode('utf-8'))
-                
-        # Save to new BytesIO
-        output_io = io.BytesIO()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".epub") as tmp_out:
-            epub.write_epub(tmp_out.name, book, {})
-            tmp_out_path = tmp_out.name
-            
-        with open(tmp_out_path, "rb") as f:
-            output_bytes = f.read()
-            
-        # Cleanup
-        os.unlink(tmp_out_path)
-        
-        return output_bytes, total_replacements
-        
-    finally:
-        if os.path.exists(tmp_in_path):
-            os.unlink(tmp_in_path)
+
+    with zipfile.ZipFile(epub_path) as zin, zipfile.ZipFile(output_path, "w") as zout:
+        for info in zin.infolist():
+            # Reusing the ZipInfo keeps each entry's name, timestamp and compression method
+            if info.filename.lower().endswith(DOCUMENT_EXTENSIONS):
+                data, count = rewrite_document(zin.read(info), matcher)
+                total_replacements += count
+                zout.writestr(info, data)
+            else:
+                with zin.open(info) as src, zout.open(info, "w") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+
+    return total_replacements
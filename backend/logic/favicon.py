@@ -0,0 +1,344 @@
+import asyncio
+import base64
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Optional
+from urllib.parse import urljoin, urlparse, quote
+
+import httpx
+from playwright.async_api import async_playwright
+
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8"
+}
+
+# Icons live in <head>; never read more than this much of a page looking for them.
+HEAD_BYTE_LIMIT = 256 * 1024
+
+# Past this size a bigger icon only costs bytes in the base64 payload.
+PREFERRED_MAX_SIZE = 256
+
+ICON_RELS = {"icon", "shortcut", "apple-touch-icon", "apple-touch-icon-precomposed"}
+
+TYPE_RANK = {
+    "image/svg+xml": 3,
+    "image/png": 2,
+    "image/webp": 2,
+    "image/x-icon": 1,
+    "image/vnd.microsoft.icon": 1,
+}
+
+EXTENSION_TYPES = {
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".webp": "image/webp",
+    ".ico": "image/x-icon",
+}
+
+SIZE_PATTERN = re.compile(r"(\d+)\s*[xX]\s*(\d+)")
+
+# Cheap strategies are launched one after another, HEDGE_DELAY apart (or as soon
+# as the previous one fails). Whatever has not won by CHEAP_DEADLINE is cancelled
+# and the headless browser takes over.
+HEDGE_DELAY = 0.3
+CHEAP_DEADLINE = 5.0
+IMAGE_TIMEOUT = 3.0
+# How long the root /favicon.ico attempt waits to learn where the page redirects to
+REDIRECT_WAIT = 1.0
+
+
+class IconLinkParser(HTMLParser):
+    """
+    Incremental tokenizer that collects icon <link> tags and flags
+    when the end of <head> has been reached.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.base_href = None
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            self.done = True
+            return
+        if tag == "base" and self.base_href is None:
+            self.base_href = dict(attrs).get("href")
+            return
+        if tag != "link":
+            return
+
+        attrs = dict(attrs)
+        rel = (attrs.get("rel") or "").lower().split()
+        href = attrs.get("href")
+        # "mask-icon" is a monochrome Safari pinned-tab glyph, not a favicon
+        if not href or "mask-icon" in rel or not ICON_RELS.intersection(rel):
+            return
+
+        self.links.append({
+            "href": href.strip(),
+            "rel": rel,
+            "type": (attrs.get("type") or "").lower().strip(),
+            "sizes": (attrs.get("sizes") or "").lower().strip(),
+            "order": len(self.links),
+        })
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self.done = True
+
+
+def _icon_type(link: dict) -> str:
+    if link["type"]:
+        return link["type"]
+    path = link["href"].split("?", 1)[0].split("#", 1)[0].lower()
+    for ext, mime in EXTENSION_TYPES.items():
+        if path.endswith(ext):
+            return mime
+    return ""
+
+
+def _icon_size(link: dict, icon_type: str) -> int:
+    if link["sizes"] == "any" or icon_type == "image/svg+xml":
+        return PREFERRED_MAX_SIZE
+    sizes = [max(int(w), int(h)) for w, h in SIZE_PATTERN.findall(link["sizes"])]
+    if sizes:
+        return max(sizes)
+    # Undeclared sizes: touch icons are 180px by convention, plain icons usually 16-32px
+    if any(r.startswith("apple-touch-icon") for r in link["rel"]):
+        return 180
+    return 32
+
+
+def rank_icon_links(links: list) -> list:
+    """
+    Orders icon links best-first by declared size (capped at PREFERRED_MAX_SIZE)
+    then by image type, keeping document order as the tie-breaker.
+    """
+    def score(link):
+        icon_type = _icon_type(link)
+        size = min(_icon_size(link, icon_type), PREFERRED_MAX_SIZE)
+        return (-size, -TYPE_RANK.get(icon_type, 0), link["order"])
+
+    return sorted(links, key=score)
+
+
+async def discover_icon_links(client, url: str, headers: dict, on_final_url=None) -> tuple[str, list]:
+    """
+    Streams the page and parses only as far as </head> (or HEAD_BYTE_LIMIT bytes).
+    `on_final_url`, if given, is called with the URL after redirects as soon
+    as the response headers arrive.
+
+    Returns:
+        A tuple containing:
+        - The final URL after redirects.
+        - Absolute icon URLs declared by the page, best candidate first.
+    """
+    async with client.stream("GET", url, headers=headers) as resp:
+        final_url = str(resp.url)
+        if on_final_url:
+            on_final_url(final_url)
+        if resp.status_code != 200:
+            return final_url, []
+
+        try:
+            decoder_cls = codecs.getincrementaldecoder(resp.charset_encoding or "utf-8")
+        except LookupError:
+            decoder_cls = codecs.getincrementaldecoder("utf-8")
+        decoder = decoder_cls(errors="replace")
+        parser = IconLinkParser()
+        received = 0
+        async for chunk in resp.aiter_bytes():
+            received += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done or received >= HEAD_BYTE_LIMIT:
+                break
+
+    base = urljoin(final_url, parser.base_href) if parser.base_href else final_url
+    return final_url, [urljoin(base, link["href"]) for link in rank_icon_links(parser.links)]
+
+
+def _data_uri(content: bytes, content_type: str) -> str:
+    return f"data:{content_type};base64,{base64.b64encode(content).decode('utf-8')}"
+
+
+async def fetch_icon(client, img_url: str, require_image_type: bool = False) -> Optional[str]:
+    """
+    Downloads a single icon candidate. Returns a data URI, or None if the
+    response is not a usable image.
+    """
+    try:
+        resp = await client.get(img_url, headers=BROWSER_HEADERS, timeout=IMAGE_TIMEOUT)
+    except Exception:
+        return None
+    if resp.status_code != 200 or not resp.content:
+        return None
+
+    content_type = resp.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    if "image" in content_type:
+        return _data_uri(resp.content, content_type)
+    # Plenty of servers send favicon.ico as text/plain or octet-stream
+    if not require_image_type and urlparse(img_url).path.endswith(".ico"):
+        return _data_uri(resp.content, "image/x-icon")
+    return None
+
+
+async def _icon_from_html(client, url: str, page_url: asyncio.Future) -> Optional[str]:
+    def settle(final_url):
+        if not page_url.done():
+            page_url.set_result(final_url)
+
+    try:
+        _, candidates = await discover_icon_links(client, url, BROWSER_HEADERS, on_final_url=settle)
+    except Exception as e:
+        print(f"Favicon HTML scan failed for {url}: {e}")
+        return None
+    finally:
+        settle(url)
+    for img_url in candidates:
+        icon = await fetch_icon(client, img_url)
+        if icon:
+            return icon
+    return None
+
+
+async def _icon_from_root(client, url: str, page_url: asyncio.Future) -> Optional[str]:
+    # /favicon.ico of the site the page redirects to (www., another domain), not
+    # just of the URL as submitted; falls back to the latter if the page is slow
+    try:
+        final_url = await asyncio.wait_for(asyncio.shield(page_url), REDIRECT_WAIT)
+    except asyncio.TimeoutError:
+        final_url = url
+    parsed = urlparse(final_url)
+    return await fetch_icon(client, f"{parsed.scheme}://{parsed.netloc}/favicon.ico")
+
+
+async def _race(attempts: list) -> Optional[str]:
+    """
+    Runs the attempt factories with staggered hedging and returns the first
+    non-empty result, cancelling everything still in flight. An attempt that
+    raises counts as a miss.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CHEAP_DEADLINE
+    remaining = iter(attempts)
+    pending = set()
+    try:
+        while True:
+            factory = next(remaining, None)
+            if factory:
+                pending.add(asyncio.create_task(factory()))
+            if not pending:
+                return None
+
+            time_left = deadline - loop.time()
+            if time_left <= 0:
+                return None
+            wait_for = min(HEDGE_DELAY, time_left) if factory else time_left
+            done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception():
+                    print(f"Favicon attempt failed: {task.exception()!r}")
+                elif task.result():
+                    return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_icon_via_browser(url: str) -> Optional[str]:
+    """
+    Heavy & Robust (Playwright Headless Browser) - STEALTH MODE.
+    Useful for sites with heavy anti-bot protections (Cloudflare, Aliyun) or dynamic JS rendering.
+    """
+    print(f"Attempting Playwright for {url}...")
+    try:
+        async with async_playwright() as p:
+            # Launch with anti-detection arguments
+            browser = await p.chromium.launch(
+                headless=True,
+                args=[
+                    "--disable-blink-features=AutomationControlled", # Hides "Chrome is being controlled by automated test software"
+                    "--no-sandbox",
+                    "--disable-setuid-sandbox"
+                ]
+            )
+
+            # Create context with realistic User-Agent and Viewport
+            context = await browser.new_context(
+                user_agent=BROWSER_HEADERS["User-Agent"],
+                viewport={"width": 1920, "height": 1080},
+                locale="zh-CN"
+            )
+
+            # Inject JS to delete 'navigator.webdriver' property (Key for bypassing detection)
+            await context.add_init_script("""
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => undefined
+                });
+            """)
+
+            page = await context.new_page()
+            try:
+                # Go to page. For SPAs (Koodo), we need to wait for network to be idle-ish.
+                # Timeout set to 15s to avoid hanging.
+                await page.goto(url, timeout=15000, wait_until="domcontentloaded")
+
+                # Try to wait for network idle (useful for SPAs loading config), but don't crash if it times out
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=3000)
+                except:
+                    pass
+
+                # Execute JS to find icon. We look for standard tags.
+                icon_href = await page.evaluate("""() => {
+                    const link = document.querySelector('link[rel*="icon"]') || document.querySelector('link[rel="apple-touch-icon"]');
+                    return link ? link.href : null;
+                }""")
+
+                if icon_href:
+                    # Download using the page context (preserves cookies/session passed anti-bot)
+                    response = await page.request.get(icon_href)
+                    if response.status == 200:
+                        body = await response.body()
+                        content_type = response.headers.get("content-type", "image/png")
+                        return _data_uri(body, content_type)
+            except Exception as e:
+                print(f"Playwright scrape error: {e}")
+            finally:
+                await browser.close()
+    except Exception as e:
+        print(f"Playwright failed: {e}")
+    return None
+
+
+async def resolve_favicon(url: str) -> Optional[str]:
+    """
+    Resolves a site's icon as a data URI, or None if every strategy fails.
+
+    Cheap strategies race in preference order: the icons declared in the page
+    <head>, the root /favicon.ico, then third-party favicon services. The
+    headless browser is only started once all of them have failed.
+    """
+    providers = [
+        f"https://api.uomg.com/api/get.favicon?url={quote(url, safe='')}",
+        f"https://www.google.com/s2/favicons?domain={quote(url, safe='')}&sz=128"
+    ]
+
+    page_url = asyncio.get_running_loop().create_future()
+    async with httpx.AsyncClient(follow_redirects=True, verify=False, timeout=5.0) as client:
+        attempts = [
+            lambda: _icon_from_html(client, url, page_url),
+            lambda: _icon_from_root(client, url, page_url),
+        ] + [
+            lambda api=api: fetch_icon(client, api, require_image_type=True)
+            for api in providers
+        ]
+        icon = await _race(attempts)
+    if icon:
+        return icon
+
+    return await fetch_icon_via_browser(url)
@@ -0,0 +1,164 @@
+import csv
+import io
+import json
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+from models import Glossary, GlossaryVersion
+
+GLOSSARY_DIR = os.environ.get("GLOSSARY_DIR", "glossaries")
+# Compiled matchers kept in memory per worker
+GLOSSARY_CACHE_SIZE = int(os.environ.get("GLOSSARY_CACHE_SIZE", "8"))
+# Each character of a term can add a nesting level to the trie regex, and both
+# building and compiling it recurse once per level
+MAX_TERM_LENGTH = 200
+
+
+def parse_glossary(filename: str, content: bytes) -> dict:
+    """
+    Parses an uploaded glossary: a JSON object of term -> replacement, or a
+    CSV/TXT file whose first two columns are term and replacement.
+    Raises ValueError for unsupported or malformed files.
+    """
+    glossary = {}
+    if filename.endswith(".json"):
+        glossary = json.loads(content.decode("utf-8"))
+        if not isinstance(glossary, dict):
+            raise ValueError("JSON glossary must be an object of term -> replacement")
+    elif filename.endswith(".csv") or filename.endswith(".txt"):
+        reader = csv.reader(io.StringIO(content.decode("utf-8")))
+        for row in reader:
+            if len(row) >= 2:
+                glossary[row[0]] = row[1]
+    else:
+        raise ValueError("Glossary must be JSON or CSV")
+    glossary = {str(term): str(replacement) for term, replacement in glossary.items() if term}
+    too_long = next((term for term in glossary if len(term) > MAX_TERM_LENGTH), None)
+    if too_long is not None:
+        raise ValueError(f"Term longer than {MAX_TERM_LENGTH} characters: {too_long[:40]}...")
+    return glossary
+
+
+def _trie_pattern(terms) -> str:
+    """
+    Builds a regex that matches any of the terms, shaped like a trie so the
+    regex engine walks shared prefixes once instead of trying every term.
+    Optional suffixes are greedy, so the longest term wins at each position.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            body = branches[0]
+            return f"(?:{body})?" if "" in node else body
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if "" in node else body
+
+    return emit(trie)
+
+
+class GlossaryMatcher:
+    """
+    A glossary compiled into a single-pass matcher. Each position of the text
+    is matched against the longest term starting there; replaced text is not
+    scanned again.
+    """
+
+    def __init__(self, pattern: str, replacements: dict):
+        self.pattern = pattern
+        self.replacements = replacements
+        self.regex = re.compile(pattern) if replacements else None
+
+    @classmethod
+    def from_glossary(cls, glossary: dict) -> "GlossaryMatcher":
+        return cls(_trie_pattern(glossary.keys()), dict(glossary))
+
+    def search(self, text: str) -> bool:
+        return bool(self.regex and self.regex.search(text))
+
+    def sub(self, text: str) -> tuple[str, int]:
+        if not self.regex:
+            return text, 0
+        return self.regex.subn(lambda m: self.replacements[m.group(0)], text)
+
+    def dumps(self) -> str:
+        return json.dumps({"pattern": self.pattern, "replacements": self.replacements}, ensure_ascii=False)
+
+    @classmethod
+    def loads(cls, data: str) -> "GlossaryMatcher":
+        payload = json.loads(data)
+        return cls(payload["pattern"], payload["replacements"])
+
+
+def _matcher_path(glossary_id: int, version: int) -> str:
+    return os.path.join(GLOSSARY_DIR, str(glossary_id), f"v{version}.json")
+
+
+def save_glossary_version(session: Session, glossary: Glossary, terms: dict) -> GlossaryVersion:
+    """Compiles the terms and stores them as the next version of the glossary."""
+    matcher = GlossaryMatcher.from_glossary(terms)
+    # Claim the number with one UPDATE: it takes SQLite's write lock, so a
+    # concurrent upload waits for this commit and gets the next number
+    number = session.connection().execute(
+        text("UPDATE glossary SET latest_version = latest_version + 1 WHERE id = :id RETURNING latest_version"),
+        {"id": glossary.id},
+    ).scalar_one()
+    version = GlossaryVersion(
+        glossary_id=glossary.id,
+        version=number,
+        term_count=len(terms),
+        created_at=datetime.now().isoformat(timespec="seconds"),
+    )
+
+    path = _matcher_path(glossary.id, version.version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(matcher.dumps())
+
+    session.add(version)
+    session.commit()
+    session.refresh(glossary)
+    session.refresh(version)
+    return version
+
+
+def create_glossary(session: Session, name: str, terms: dict) -> GlossaryVersion:
+    glossary = Glossary(name=name, latest_version=0, created_at=datetime.now().isoformat(timespec="seconds"))
+    session.add(glossary)
+    session.commit()
+    session.refresh(glossary)
+    return save_glossary_version(session, glossary, terms)
+
+
+@lru_cache(maxsize=GLOSSARY_CACHE_SIZE)
+def _load_matcher(glossary_id: int, version: int) -> GlossaryMatcher:
+    # Versions are immutable, so a cached matcher never goes stale
+    with open(_matcher_path(glossary_id, version), "r", encoding="utf-8") as f:
+        return GlossaryMatcher.loads(f.read())
+
+
+def get_matcher(session: Session, glossary_id: int, version: Optional[int] = None) -> Optional[GlossaryMatcher]:
+    """The compiled matcher for a glossary version (latest by default), or None if it doesn't exist."""
+    glossary = session.get(Glossary, glossary_id)
+    if not glossary:
+        return None
+    version = version or glossary.latest_version
+    exists = session.exec(
+        select(GlossaryVersion).where(GlossaryVersion.glossary_id == glossary_id, GlossaryVersion.version == version)
+    ).first()
+    if not exists:
+        return None
+    return _load_matcher(glossary_id, version)
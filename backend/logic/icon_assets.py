@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from typing import Optional
+
+import fitz  # PyMuPDF
+import httpx
+from PIL import Image, ImageOps
+
+from .favicon import BROWSER_HEADERS
+
+ICON_DIR = os.environ.get("ICON_ASSET_DIR", "static/icons")
+# Path the frontend reaches ICON_DIR under (through the /api/py proxy)
+ICON_URL_PREFIX = "/api/py/icons/"
+# Raster icons are scaled to fit this box; the app grid shows them at 80px or less
+ICON_SIZE = 160
+# Local copies are re-fetched after this long, in case the upstream icon changed
+ICON_REFRESH_SECONDS = 7 * 24 * 3600
+ICON_CONCURRENCY = 8
+MAX_ICON_BYTES = 5 * 1024 * 1024
+# Files dropped from the manifest stay this long for clients holding an older catalog
+ORPHAN_GRACE_SECONDS = 24 * 3600
+
+MANIFEST_PATH = os.path.join(ICON_DIR, "manifest.json")
+
+# source URL -> {"file", "fetched_at"}; reloaded when another worker rewrites the manifest
+_manifest = {}
+_manifest_mtime = None
+
+
+def _load_manifest() -> dict:
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.path.getmtime(MANIFEST_PATH)
+    except OSError:
+        return _manifest
+    if mtime != _manifest_mtime:
+        try:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                _manifest = json.load(f)
+            _manifest_mtime = mtime
+        except (OSError, json.JSONDecodeError):
+            pass
+    return _manifest
+
+
+def _save_manifest(manifest: dict):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def local_icon_url(url: Optional[str]) -> Optional[str]:
+    """The local copy of a remote icon if it has been synced, otherwise the URL unchanged."""
+    if not url or not url.startswith("http"):
+        return url
+    entry = _load_manifest().get(url)
+    return ICON_URL_PREFIX + entry["file"] if entry else url
+
+
+def _rasterize_svg(data: bytes) -> bytes:
+    # Rendered by MuPDF, which runs no scripts and fetches nothing
+    with fitz.open(stream=data, filetype="svg") as doc:
+        page = doc[0]
+        zoom = ICON_SIZE / max(page.rect.width, page.rect.height, 1)
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=True).tobytes("png")
+
+
+def normalize_icon(data: bytes, content_type: str = "") -> tuple[bytes, str]:
+    """
+    Returns (bytes, extension). Every icon is EXIF-rotated, scaled down to
+    ICON_SIZE and re-encoded as PNG; SVGs are rasterized first, so no markup
+    from an upstream site is ever served from our origin.
+    Raises ValueError for anything that is not a usable image.
+    """
+    head = data[:1024].lstrip().lower()
+    if "svg" in content_type or head.startswith((b"<svg", b"<?xml")):
+        try:
+            data = _rasterize_svg(data)
+        except Exception as e:
+            raise ValueError(f"not a readable SVG: {e}")
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            # Multi-size .ico files open at their largest size
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA")
+            img.thumbnail((ICON_SIZE, ICON_SIZE), Image.LANCZOS)
+            out = io.BytesIO()
+            img.save(out, "PNG", optimize=True)
+    except Exception as e:
+        raise ValueError(f"not a readable image: {e}")
+    return out.getvalue(), ".png"
+
+
+async def _download(client: httpx.AsyncClient, url: str) -> tuple[bytes, str]:
+    # The limit is enforced while reading, so a huge or endless body is cut off early
+    async with client.stream("GET", url, headers=BROWSER_HEADERS) as resp:
+        resp.raise_for_status()
+        length = resp.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_ICON_BYTES:
+            raise ValueError("icon too large")
+        chunks, size = [], 0
+        async for chunk in resp.aiter_bytes():
+            size += len(chunk)
+            if size > MAX_ICON_BYTES:
+                raise ValueError("icon too large")
+            chunks.append(chunk)
+        return b"".join(chunks), resp.headers.get("content-type", "")
+
+
+async def _fetch_icon(client: httpx.AsyncClient, url: str) -> Optional[str]:
+    content, content_type = await _download(client, url)
+    data, extension = await asyncio.to_thread(normalize_icon, content, content_type)
+    # Content-addressed, so the file can be cached forever and identical icons are stored once
+    filename = hashlib.sha256(data).hexdigest()[:24] + extension
+    path = os.path.join(ICON_DIR, filename)
+    if not os.path.exists(path):
+        # Served as immutable, so it must never be seen half-written
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=ICON_DIR)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return filename
+
+
+def _remove_orphans(manifest: dict):
+    referenced = {entry["file"] for entry in manifest.values()}
+    now = time.time()
+    for name in os.listdir(ICON_DIR):
+        path = os.path.join(ICON_DIR, name)
+        if name in referenced or name.startswith("manifest.json"):
+            continue
+        try:
+            # Markup from before icons were rasterized goes at once; a .tmp may
+            # still be being written, so only stale ones are removed
+            if not name.endswith((".png", ".tmp")) or now - os.path.getmtime(path) > ORPHAN_GRACE_SECONDS:
+                os.unlink(path)
+        except OSError:
+            pass
+
+
+async def sync_icons(urls) -> int:
+    """
+    Downloads every remote icon that has no local copy yet (or an outdated
+    one) and records it in the manifest. Failed downloads keep the remote
+    URL and are retried on the next sync. Icons no longer in `urls` are
+    dropped, and their files deleted after a grace period. Returns the
+    number of icons added, changed or dropped.
+    """
+    os.makedirs(ICON_DIR, exist_ok=True)
+    wanted = {url for url in urls if url and url.startswith("http")}
+    loaded = _load_manifest()
+    manifest = {url: entry for url, entry in loaded.items() if url in wanted and entry["file"].endswith(".png")}
+    changed = len(loaded) - len(manifest)
+    now = time.time()
+    pending = sorted(
+        url for url in wanted
+        if url not in manifest or now - manifest[url]["fetched_at"] > ICON_REFRESH_SECONDS
+    )
+    if not pending and not changed:
+        _remove_orphans(manifest)
+        return 0
+
+    semaphore = asyncio.Semaphore(ICON_CONCURRENCY)
+
+    async def sync_one(client, url):
+        nonlocal changed
+        async with semaphore:
+            try:
+                filename = await _fetch_icon(client, url)
+            except Exception as e:
+                print(f"Icon sync failed for {url}: {e}")
+                return
+        if manifest.get(url, {}).get("file") != filename:
+            changed += 1
+        manifest[url] = {"file": filename, "fetched_at": now}
+
+    async with httpx.AsyncClient(follow_redirects=True, timeout=15.0) as client:
+        await asyncio.gather(*(sync_one(client, url) for url in pending))
+
+    _save_manifest(manifest)
+    _remove_orphans(manifest)
+    print(f"Icon sync finished: {len(pending)} checked, {changed} updated.")
+    return changed
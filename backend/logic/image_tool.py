@@ -0,0 +1,196 @@
+import asyncio
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageOps, features
+
+# uvicorn worker processes on this machine (exported by start.sh); each has its own pool
+WEB_WORKERS = max(1, int(os.environ.get("BACKEND_WORKERS", "1")))
+# Image processes per uvicorn worker; by default the cores are shared out between them
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // WEB_WORKERS)
+# Largest canvas an image job may produce; the same limit Pillow applies to inputs
+MAX_OUTPUT_PIXELS = Image.MAX_IMAGE_PIXELS
+
+# format name -> (Pillow format, file extension, media type)
+OUTPUT_FORMATS = {
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+    "webp": ("WEBP", ".webp", "image/webp"),
+    "avif": ("AVIF", ".avif", "image/avif"),
+    "png": ("PNG", ".png", "image/png"),
+}
+
+# A4 in points, the same page jsPDF used in the browser
+PDF_PAGE_SIZE = (595, 842)
+# EXIF orientations that rotate the image by 90 degrees
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+_pool = None
+
+
+def format_supported(fmt: str) -> bool:
+    if fmt not in OUTPUT_FORMATS:
+        return False
+    return fmt != "avif" or features.check("avif")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Not fork: by now the server has other threads, and a forked child could
+        # inherit a lock one of them was holding
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+    return _pool
+
+
+async def run_in_pool(fn, *args):
+    """Runs a CPU-bound image job in the worker processes, off the event loop and the GIL."""
+    return await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _display_size(img: Image.Image) -> tuple[int, int]:
+    # Size after EXIF rotation, read from the header without decoding pixels
+    width, height = img.size
+    if img.getexif().get(0x0112) in TRANSPOSED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def _prepare(img: Image.Image, pil_format: str) -> Image.Image:
+    """Applies EXIF rotation and converts to a mode the output format can store."""
+    img = ImageOps.exif_transpose(img)
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    if pil_format == "JPEG" and has_alpha:
+        # JPEG has no alpha; flatten onto white like the browser canvas export did
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img.convert("RGBA"), mask=img.convert("RGBA").getchannel("A"))
+        return background
+    if pil_format == "PNG" or has_alpha:
+        return img if img.mode in ("RGB", "RGBA") else img.convert("RGBA" if has_alpha else "RGB")
+    return img if img.mode == "RGB" else img.convert("RGB")
+
+
+def _encode(img: Image.Image, pil_format: str, quality: int, out):
+    if pil_format == "PNG":
+        img.save(out, "PNG", optimize=True)
+    elif pil_format == "JPEG":
+        img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(out, pil_format, quality=quality)
+
+
+def compress_image(src_path: str, dst_path: str, fmt: str = "jpeg", quality: int = 80,
+                   target_bytes: int = None, max_dimension: int = None) -> dict:
+    """
+    Re-encodes one image. With target_bytes, the highest quality (up to
+    `quality`) whose output fits is found by binary search; if none fits,
+    the lowest quality tried is kept.
+    """
+    pil_format = OUTPUT_FORMATS[fmt][0]
+    with Image.open(src_path) as img:
+        if max_dimension:
+            # JPEG can decode straight at a reduced scale, skipping most of the work
+            img.draft("RGB", (max_dimension, max_dimension))
+            img = _prepare(img, pil_format)
+            img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        else:
+            img = _prepare(img, pil_format)
+
+        if target_bytes and pil_format != "PNG":
+            low, high = 10, quality
+            best = None
+            while low <= high:
+                q = (low + high) // 2
+                buffer = io.BytesIO()
+                _encode(img, pil_format, q, buffer)
+                if buffer.tell() <= target_bytes:
+                    best = (q, buffer)
+                    low = q + 1
+                else:
+                    high = q - 1
+            if best is None:
+                buffer = io.BytesIO()
+                _encode(img, pil_format, 10, buffer)
+                best = (10, buffer)
+            quality = best[0]
+            with open(dst_path, "wb") as f:
+                f.write(best[1].getbuffer())
+        else:
+            _encode(img, pil_format, quality, dst_path)
+
+        return {"size": os.path.getsize(dst_path), "quality": quality, "width": img.width, "height": img.height}
+
+
+def stitch_images(paths: list, dst_path: str, direction: str = "horizontal", scale: float = 1.0) -> dict:
+    """
+    Joins images side by side (or top to bottom), scaling each to the tallest
+    (or widest) one, then by `scale`. Images are decoded one at a time, so
+    only the output canvas and a single input are in memory.
+    """
+    sizes = []
+    has_alpha = False
+    for path in paths:
+        with Image.open(path) as img:
+            sizes.append(_display_size(img))
+            has_alpha = has_alpha or img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+
+    if direction == "horizontal":
+        target = max(h for _, h in sizes)
+        boxes = [(round(w * target / h * scale), round(target * scale)) for w, h in sizes]
+        canvas_size = (sum(w for w, _ in boxes), round(target * scale))
+    else:
+        target = max(w for w, _ in sizes)
+        boxes = [(round(target * scale), round(h * target / w * scale)) for w, h in sizes]
+        canvas_size = (round(target * scale), sum(h for _, h in boxes))
+
+    if canvas_size[0] * canvas_size[1] > MAX_OUTPUT_PIXELS:
+        raise Image.DecompressionBombError(
+            f"Stitched image of {canvas_size[0]}x{canvas_size[1]} exceeds {MAX_OUTPUT_PIXELS} pixels"
+        )
+
+    mode = "RGBA" if has_alpha else "RGB"
+    canvas = Image.new(mode, canvas_size, (0, 0, 0, 0) if has_alpha else (255, 255, 255))
+    offset = 0
+    for path, box in zip(paths, boxes):
+        with Image.open(path) as img:
+            img.draft(mode, box)
+            img = ImageOps.exif_transpose(img).convert(mode)
+            if img.size != box:
+                img = img.resize(box, Image.LANCZOS)
+            canvas.paste(img, (offset, 0) if direction == "horizontal" else (0, offset))
+        offset += box[0] if direction == "horizontal" else box[1]
+
+    canvas.save(dst_path, "PNG", compress_level=6)
+    return {"size": os.path.getsize(dst_path), "width": canvas.width, "height": canvas.height}
+
+
+def images_to_pdf(paths: list, dst_path: str) -> dict:
+    """
+    Puts each image on its own A4 page, scaled to fit and centred. Upright
+    JPEG and PNG files are embedded as-is without re-encoding; anything else
+    is converted first.
+    """
+    with fitz.open() as doc:
+        for path in paths:
+            page = doc.new_page(width=PDF_PAGE_SIZE[0], height=PDF_PAGE_SIZE[1])
+            with Image.open(path) as img:
+                upright = img.getexif().get(0x0112, 1) == 1
+                if img.format in ("JPEG", "PNG") and upright:
+                    page.insert_image(page.rect, filename=path, keep_proportion=True)
+                    continue
+                pil_format = "PNG" if img.mode in ("RGBA", "LA", "PA", "P") else "JPEG"
+                buffer = io.BytesIO()
+                _encode(_prepare(img, pil_format), pil_format, 92, buffer)
+            page.insert_image(page.rect, stream=buffer.getvalue(), keep_proportion=True)
+        doc.save(dst_path, garbage=3, deflate=True)
+        pages = doc.page_count
+    return {"size": os.path.getsize(dst_path), "pages": pages}
@@ -0,0 +1,118 @@
+import os
+import tempfile
+
+from starlette.responses import JSONResponse
+
+# Largest single uploaded file, enforced per file while it is spooled
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(1024 ** 3)))
+# Largest request body as a whole (a batch of files plus form fields), checked
+# against Content-Length up front and counted while the body streams
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", str(4 * 1024 ** 3)))
+# Defaults to the system temp dir; point it at a disk with room for large documents
+SPOOL_DIR = os.environ.get("SPOOL_DIR") or None
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class ScratchFiles:
+    """
+    Temporary files owned by one request. Uploads are streamed here in
+    chunks so documents are handed to PyMuPDF / zipfile by path and never
+    held in memory; everything is removed together by cleanup().
+    """
+
+    def __init__(self):
+        self.paths = []
+
+    def new(self, suffix: str = "") -> str:
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=SPOOL_DIR)
+        os.close(fd)
+        self.paths.append(path)
+        return path
+
+    async def add_upload(self, upload, suffix: str = "", max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+        # Starlette spools large parts to an anonymous temp file that has no
+        # path, and the tools (PyMuPDF, zipfile, the image worker processes)
+        # open their input by path, so this one copy is deliberate.
+        path = self.new(suffix)
+        size = 0
+        with open(path, "wb") as out:
+            while chunk := await upload.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"{upload.filename} exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+                out.write(chunk)
+        # Starlette's own spooled copy is no longer needed
+        await upload.close()
+        return path
+
+    def release(self, path: str):
+        if path in self.paths:
+            self.paths.remove(path)
+        if os.path.exists(path):
+            os.unlink(path)
+
+    def cleanup(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.unlink(path)
+        self.paths = []
+
+
+class RequestSizeLimit:
+    """
+    ASGI middleware holding request bodies to max_bytes. A declared
+    Content-Length over the limit is refused before anything is read; a
+    chunked body is cut off as soon as the running total passes it, so the
+    multipart parser never spools more than the limit to disk.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def counting_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise UploadTooLarge("Upload too large")
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            # Whatever the app makes of the cut-off body is replaced by the 413
+            if exceeded:
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not started:
+            await self._reject(scope, receive, send)
+
+    @staticmethod
+    async def _reject(scope, receive, send):
+        await JSONResponse(status_code=413, content={"detail": "Upload too large"})(scope, receive, send)
@@ -1,25 +1,21 @@
 import fitz  # PyMuPDF
-import io
-from typing import List
+import zipfile
 
-def convert_pdf_to_images(pdf_bytes: bytes, dpi: int = 150) -> List[bytes]:
+def write_pdf_images_zip(pdf_path: str, zip_path: str, base_name: str, dpi: int = 150) -> int:
     """
-    Converts a PDF file to a list of images (PNG bytes).
+    Renders every page of a PDF to PNG and writes them straight into a ZIP file.
     
     Args:
-        pdf_bytes: The binary content of the PDF file.
+        pdf_path: Path of the PDF; PyMuPDF reads pages from disk on demand.
+        zip_path: Where to write the ZIP archive.
+        base_name: Prefix for the image names inside the archive.
         dpi: Resolution for the output images.
         
     Returns:
-        A list of bytes, where each item is a PNG image.
+        The number of pages rendered. Only one page image is in memory at a time.
     """
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    images = []
-    
-    for page in doc:
-        pix = page.get_pixmap(dpi=dpi)
-        img_bytes = pix.tobytes("png")
-        images.append(img_bytes)
-        
-    doc.close()
-    return images
+    with fitz.open(pdf_path) as doc, zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, page in enumerate(doc):
+            pix = page.get_pixmap(dpi=dpi)
+            zf.writestr(f"{base_name}_page_{i+1}.png", pix.tobytes("png"))
+        return doc.page_count
@@ -1,38 +1,152 @@
 from contextlib import asynccontextmanager
+from typing import List
 from fastapi import FastAPI, Depends, BackgroundTasks, UploadFile, File, Form, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, FileResponse, StreamingResponse, RedirectResponse, JSONResponse
 from sqlmodel import Session, select
 from database import create_db_and_tables, get_session, engine
-from models import Tool
+import hashlib
+from models import Tool, CrawlHistory, CatalogTool, CatalogPage, NewsItem, FaviconResult, Glossary, GlossaryVersion
+from typing import Optional
+from search_index import ensure_search_index, sync_search_index, search_tools, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from diagnostics import LoopMonitor, SamplingProfiler, is_admin, LOOP_MONITOR_ENABLED
+from payloads import (
+    CachedPayload, DynamicGZipMiddleware, ImmutableStaticFiles, payload_response, MIN_COMPRESS_SIZE, INCOMPRESSIBLE_TYPES
+)
+from coordination import (
+    renew_leadership, release_leadership, leader_only, invalidate, generation,
+    shared_get, shared_set, purge_expired, HEARTBEAT_SECONDS
+)
+from pydantic import TypeAdapter
 from urllib.parse import quote
 from logic.crawler import crawl_tools
 from logic.news import fetch_github_trending
 from logic.epub_tool import replace_terms_in_epub
-from logic.pdf_tool import convert_pdf_to_images
-from logic.accelerator import get_smart_link
+from logic.glossary import (
+    parse_glossary, create_glossary, save_glossary_version, get_matcher, GlossaryMatcher
+)
+from logic.pdf_tool import write_pdf_images_zip
+from logic.ingest import ScratchFiles, UploadTooLarge, RequestSizeLimit, MAX_REQUEST_BYTES
+from logic.image_tool import (
+    OUTPUT_FORMATS, format_supported, run_in_pool, shutdown_pool,
+    compress_image, stitch_images, images_to_pdf,
+)
+from PIL import Image, UnidentifiedImageError
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from logic.accelerator import (
+    get_smart_link, probe_mirrors, mirror_status, mirror_selection, export_scores, load_scores,
+    PROBE_INTERVAL_MINUTES
+)
+from logic.favicon import resolve_favicon
+from logic.icon_assets import ICON_DIR, local_icon_url, sync_icons
+from logic.download_cache import load_cached, start_fill
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from datetime import datetime
 import json
-import csv
-import io
 import zipfile
-import httpx
-import base64
 import os
 import shutil
+import asyncio
+import time
+
+NEWS_REFRESH_MINUTES = 30
+FAVICON_TTL_SECONDS = 7 * 24 * 3600
+FAVICON_MISS_TTL_SECONDS = 3600
+CATALOG_SHARED_TTL_SECONDS = 24 * 3600
+
+# Background jobs. Every worker runs the scheduler, but upstream-facing jobs
+# only execute in the worker holding the leader lease.
+
+@leader_only
+async def scheduled_probe():
+    await probe_mirrors()
+    await run_in_threadpool(shared_set, "mirror_scores", json.dumps(export_scores()).encode("utf-8"))
+    await run_in_threadpool(invalidate, "mirrors")
+
+@leader_only
+async def scheduled_news_refresh():
+    await refresh_news()
+
+@leader_only
+async def scheduled_icon_sync():
+    # Checks for new icons whenever apps.json or the tools table changes, and once a day for stale copies
+    key = (_catalog_key(), datetime.now().date())
+    if _icon_sync_state.get("key") == key:
+        return
+    _icon_sync_state["key"] = key
+
+    urls = []
+    try:
+        with open("apps.json", "r", encoding="utf-8") as f:
+            urls = [app.get("icon_url") for app in json.load(f)]
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Icon sync could not read apps.json: {e}")
+    with Session(engine) as session:
+        urls += session.exec(select(Tool.icon_url)).all()
+
+    if await sync_icons(urls):
+        await run_in_threadpool(invalidate, "catalog")
+
+@leader_only
+async def scheduled_search_sync():
+    # Catches apps.json edits; tool changes are indexed by the worker that made them
+    if _search_synced.get("key") != _catalog_key():
+        with Session(engine) as session:
+            await run_in_threadpool(refresh_search_index, session)
+
+@leader_only
+async def scheduled_cleanup():
+    await run_in_threadpool(purge_expired)
+
+# generation name -> generation this worker last loaded
+_synced_generations = {}
+
+def sync_shared_state():
+    """Pulls state published by the leader once its generation changes."""
+    current = generation("mirrors")
+    if _synced_generations.get("mirrors") != current:
+        scores = shared_get("mirror_scores")
+        if scores:
+            load_scores(json.loads(scores))
+        _synced_generations["mirrors"] = current
+
+loop_monitor = LoopMonitor()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    ensure_search_index(engine)
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    renew_leadership()
+    sync_shared_state()
+
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(renew_leadership, "interval", seconds=HEARTBEAT_SECONDS)
+    scheduler.add_job(sync_shared_state, "interval", seconds=5)
+    # First probe runs right away so /tools stops pointing at dead mirrors quickly
+    scheduler.add_job(scheduled_probe, "interval", minutes=PROBE_INTERVAL_MINUTES, next_run_time=datetime.now())
+    scheduler.add_job(scheduled_news_refresh, "interval", minutes=NEWS_REFRESH_MINUTES)
+    scheduler.add_job(scheduled_cleanup, "interval", hours=1)
+    scheduler.add_job(scheduled_search_sync, "interval", seconds=5, next_run_time=datetime.now())
+    scheduler.add_job(scheduled_icon_sync, "interval", minutes=1, next_run_time=datetime.now())
+    scheduler.start()
     yield
+    scheduler.shutdown(wait=False)
+    loop_monitor.stop()
+    shutdown_pool()
+    release_leadership()
 
 app = FastAPI(lifespan=lifespan)
 
 # Mount uploads directory
 os.makedirs("uploads", exist_ok=True)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Localized app icons (see logic/icon_assets.py)
+os.makedirs(ICON_DIR, exist_ok=True)
+app.mount("/icons", ImmutableStaticFiles(directory=ICON_DIR), name="icons")
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,6 +157,29 @@ app.add_middleware(
     expose_headers=["X-Processing-Stats", "Content-Disposition"],
 )
 
+# Dynamic responses; /tools and /news bring their own pre-compressed bodies,
+# and installers under /dl are passed through byte for byte
+app.add_middleware(
+    DynamicGZipMiddleware,
+    minimum_size=MIN_COMPRESS_SIZE,
+    exclude_content_types=INCOMPRESSIBLE_TYPES,
+    exclude_paths=("/dl/",),
+)
+
+CATALOG_ADAPTER = TypeAdapter(List[CatalogTool])
+NEWS_ADAPTER = TypeAdapter(List[NewsItem])
+
+# name -> (cache key, CachedPayload); per-worker copies of the shared payloads
+_payload_cache = {}
+_news_lock = asyncio.Lock()
+# Catalog state the leader last fully synced the search index against
+_search_synced = {}
+_icon_sync_state = {}
+
+# Reject oversized bodies before the multipart parser spools them to disk.
+# This is the whole batch; each file is held to MAX_UPLOAD_BYTES by ScratchFiles.
+app.add_middleware(RequestSizeLimit, max_bytes=MAX_REQUEST_BYTES)
+
 @app.middleware("http")
 async def strip_api_prefix(request: Request, call_next):
     path = request.url.path
@@ -51,9 +188,32 @@ async def strip_api_prefix(request: Request, call_next):
     response = await call_next(request)
     return response
 
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from playwright.async_api import async_playwright
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    ?profile=1 (or an X-Profile: 1 header) from an admin replaces the
+    response with a sampling profile of the request in folded-stack format.
+    """
+    if request.query_params.get("profile") != "1" and request.headers.get("x-profile") != "1":
+        return await call_next(request)
+    if not is_admin(request):
+        return JSONResponse(status_code=403, content={"detail": "Profiling requires an admin token"})
+
+    started = time.perf_counter()
+    with SamplingProfiler() as profiler:
+        response = await call_next(request)
+        # Streamed bodies do their work while being sent, so drain them inside the profile
+        async for _ in response.body_iterator:
+            pass
+    return Response(
+        content=profiler.folded(),
+        media_type="text/plain",
+        headers={
+            "X-Profile-Status": str(response.status_code),
+            "X-Profile-Samples": str(profiler.samples),
+            "X-Profile-Elapsed-Ms": f"{(time.perf_counter() - started) * 1000:.0f}",
+        },
+    )
 
 @app.post("/api/upload")
 async def upload_file(file: UploadFile = File(...)):
@@ -68,7 +228,7 @@ async def upload_file(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-@app.get("/api/favicon")
+@app.get("/api/favicon", response_model=FaviconResult)
 async def get_favicon(url: str):
     if not url:
         raise HTTPException(status_code=400, detail="URL is required")
@@ -77,138 +237,107 @@ async def get_favicon(url: str):
     if not url.startswith("http"):
         url = "https://" + url
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8"
-    }
-
-    # Strategy 1: Fast & Lightweight (HTTPX + BeautifulSoup)
-    try:
-        async with httpx.AsyncClient(follow_redirects=True, verify=False, timeout=5.0) as client:
-            # 2. Try to fetch the page HTML directly
-            resp = await client.get(url, headers=headers)
-            if resp.status_code == 200:
-                # 3. Parse HTML for icon links
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                icon_link = (
-                    soup.find("link", rel=lambda x: x and 'icon' in x.lower().split()) or
-                    soup.find("link", rel="apple-touch-icon") or
-                    soup.find("link", rel="shortcut icon")
-                )
-
-                candidates = []
-                
-                # If HTML defines an icon, use it
-                if icon_link and icon_link.get("href"):
-                    candidates.append(urljoin(str(resp.url), icon_link.get("href")))
-
-                # Always add default favicon.ico at root as candidate
-                parsed_uri = urlparse(str(resp.url))
-                base_domain = f"{parsed_uri.scheme}://{parsed_uri.netloc}"
-                candidates.append(urljoin(base_domain, "/favicon.ico"))
-
-                # 4. Try to fetch the image candidates
-                for img_url in candidates:
-                    try:
-                        img_resp = await client.get(img_url, headers=headers, timeout=3.0)
-                        if img_resp.status_code == 200 and len(img_resp.content) > 0:
-                            # Verify it's an image
-                            content_type = img_resp.headers.get("content-type", "").lower()
-                            if "image" in content_type or img_url.endswith(".ico"):
-                                b64_img = base64.b64encode(img_resp.content).decode("utf-8")
-                                final_type = content_type if "image" in content_type else "image/x-icon"
-                                return {"icon": f"data:{final_type};base64,{b64_img}"}
-                    except Exception:
-                        continue
-    except Exception as e:
-        print(f"Fast scrape failed for {url}: {e}")
-
-    # Strategy 2: Heavy & Robust (Playwright Headless Browser) - STEALTH MODE
-    # Useful for sites with heavy anti-bot protections (Cloudflare, Aliyun) or dynamic JS rendering
-    print(f"Attempting Playwright for {url}...")
-    try:
-        async with async_playwright() as p:
-            # Launch with anti-detection arguments
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-blink-features=AutomationControlled", # Hides "Chrome is being controlled by automated test software"
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox"
-                ]
-            )
-            
-            # Create context with realistic User-Agent and Viewport
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={"width": 1920, "height": 1080},
-                locale="zh-CN"
-            )
-            
-            # Inject JS to delete 'navigator.webdriver' property (Key for bypassing detection)
-            await context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-            """)
-
-            page = await context.new_page()
-            try:
-                # Go to page. For SPAs (Koodo), we need to wait for network to be idle-ish.
-                # Timeout set to 15s to avoid hanging.
-                await page.goto(url, timeout=15000, wait_until="domcontentloaded")
-                
-                # Try to wait for network idle (useful for SPAs loading config), but don't crash if it times out
-                try:
-                    await page.wait_for_load_state("networkidle", timeout=3000)
-                except:
-                    pass
-                
-                # Execute JS to find icon. We look for standard tags.
-                icon_href = await page.evaluate("""() => {
-                    const link = document.querySelector('link[rel*="icon"]') || document.querySelector('link[rel="apple-touch-icon"]');
-                    return link ? link.href : null;
-                }""")
-                
-                if icon_href:
-                     # Download using the page context (preserves cookies/session passed anti-bot)
-                     response = await page.request.get(icon_href)
-                     if response.status == 200:
-                         body = await response.body()
-                         content_type = response.headers.get("content-type", "image/png")
-                         b64_img = base64.b64encode(body).decode("utf-8")
-                         return {"icon": f"data:{content_type};base64,{b64_img}"}
-            except Exception as e:
-                print(f"Playwright scrape error: {e}")
-            finally:
-                await browser.close()
-    except Exception as e:
-        print(f"Playwright failed: {e}")
-
-    # Strategy 3: Third-Party APIs (Last Resort)
-    async with httpx.AsyncClient(follow_redirects=True, verify=False, timeout=5.0) as client:
-        providers = [
-            f"https://api.uomg.com/api/get.favicon?url={url}",
-            f"https://www.google.com/s2/favicons?domain={url}&sz=128"
-        ]
-        
-        for api in providers:
-            try:
-                resp = await client.get(api, timeout=3.0)
-                if resp.status_code == 200 and "image" in resp.headers.get("content-type", ""):
-                     b64_img = base64.b64encode(resp.content).decode("utf-8")
-                     return {"icon": f"data:{resp.headers.get('content-type')};base64,{b64_img}"}
-            except:
-                continue
+    cache_key = f"favicon:{url}"
+    # The shared cache is SQLite; a lock wait there must not stall the event loop
+    cached = await run_in_threadpool(shared_get, cache_key)
+    if cached is not None:
+        return {"icon": cached.decode("utf-8") or None}
 
-    return {"icon": None}
+    icon = await resolve_favicon(url)
+    # Misses are cached briefly too, so a dead site doesn't keep launching browsers
+    ttl = FAVICON_TTL_SECONDS if icon else FAVICON_MISS_TTL_SECONDS
+    await run_in_threadpool(shared_set, cache_key, (icon or "").encode("utf-8"), ttl)
+    return {"icon": icon}
 
 @app.get("/")
 def read_root():
     return {"message": "SimpleStart API is running"}
 
-@app.get("/tools")
-def get_tools(session: Session = Depends(get_session)):
+def smart_download_url(db_app: Tool):
+    # Crawled tools are re-accelerated on every read so the current best mirror is served;
+    # manually edited tools keep the link they were saved with.
+    if db_app.original_download_url:
+        return get_smart_link(db_app.original_download_url)
+    return db_app.smart_download_url
+
+def catalog_payload(session: Session) -> CachedPayload:
+    """
+    The serialized catalog, rebuilt only when a tool changes, apps.json is
+    edited or the mirror probes switch a download to a different mirror.
+    """
+    try:
+        config_mtime = os.path.getmtime("apps.json")
+    except OSError:
+        config_mtime = None
+    key = (generation("catalog"), config_mtime, mirror_selection())
+
+    cached = _payload_cache.get("catalog")
+    if cached and cached[0] == key:
+        return cached[1]
+
+    # Another worker may already have built this exact snapshot
+    shared_key = "catalog:" + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    body = shared_get(shared_key)
+    if body is not None:
+        payload = CachedPayload(body)
+    else:
+        payload = CachedPayload.from_items(CATALOG_ADAPTER, build_catalog(session))
+        shared_set(shared_key, payload.body, ttl=CATALOG_SHARED_TTL_SECONDS)
+    _payload_cache["catalog"] = (key, payload)
+    return payload
+
+@app.get("/tools", response_model=List[CatalogTool])
+def get_tools(request: Request, session: Session = Depends(get_session)):
+    return payload_response(request, catalog_payload(session))
+
+def catalog_entries(session: Session) -> dict:
+    """The current catalog by tool name, decoded once per catalog payload."""
+    payload = catalog_payload(session)
+    cached = _payload_cache.get("catalog_entries")
+    if not cached or cached[0] != payload.etag:
+        cached = (payload.etag, {tool["name"]: tool for tool in json.loads(payload.body)})
+        _payload_cache["catalog_entries"] = cached
+    return cached[1]
+
+def refresh_search_index(session: Session, names: Optional[set] = None):
+    key = _catalog_key()
+    sync_search_index(session, build_catalog(session), names)
+    if names is None:
+        _search_synced["key"] = key
+
+def publish_tool_change(session: Session, names: set):
+    """Makes a tool change visible at once: new catalog generation and re-indexed search rows."""
+    invalidate("catalog")
+    refresh_search_index(session, names)
+
+def _catalog_key():
+    try:
+        config_mtime = os.path.getmtime("apps.json")
+    except OSError:
+        config_mtime = None
+    return (generation("catalog"), config_mtime)
+
+@app.get("/tools/search", response_model=CatalogPage)
+def search_catalog(
+    q: str = "",
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    session: Session = Depends(get_session),
+):
+    """
+    Prefix search over tool names, categories, descriptions and versions,
+    ranked by bm25, one page at a time. Pass next_cursor back to continue.
+    """
+    try:
+        names, next_cursor = search_tools(session, q, category, cursor, max(1, min(limit, MAX_PAGE_SIZE)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    entries = catalog_entries(session)
+    return {"items": [entries[name] for name in names if name in entries], "next_cursor": next_cursor}
+
+def build_catalog(session: Session) -> list:
     # 1. Load config
     config_tools = []
     try:
@@ -244,7 +373,7 @@ def get_tools(session: Session = Depends(get_session)):
             # If DB has version info, it takes precedence for "latest"
             if db_app.version:
                 app["version"] = db_app.version
-                app["smart_download_url"] = db_app.smart_download_url
+                app["smart_download_url"] = smart_download_url(db_app)
             
             # Prioritize versions_json from DB if available
             if db_app.versions_json:
@@ -254,13 +383,13 @@ def get_tools(session: Session = Depends(get_session)):
                     # Fallback to single version if JSON parse fails
                      app["versions"] = [{
                         "version": db_app.version,
-                        "url": db_app.smart_download_url or db_app.original_download_url
+                        "url": smart_download_url(db_app) or db_app.original_download_url
                     }]
             elif db_app.version:
                 # Construct single-version list for the frontend to render "Direct Download" or "Latest"
                 app["versions"] = [{
                     "version": db_app.version,
-                    "url": db_app.smart_download_url or db_app.original_download_url
+                    "url": smart_download_url(db_app) or db_app.original_download_url
                 }]
             
             # Remove from map so we know it's handled
@@ -280,7 +409,7 @@ def get_tools(session: Session = Depends(get_session)):
         if not versions_list and db_app.version:
              versions_list = [{
                 "version": db_app.version,
-                "url": db_app.smart_download_url or db_app.original_download_url
+                "url": smart_download_url(db_app) or db_app.original_download_url
             }]
 
         final_tools.append({
@@ -290,7 +419,7 @@ def get_tools(session: Session = Depends(get_session)):
             "homepage_url": db_app.homepage_url,
             "icon_url": db_app.icon_url,
             "version": db_app.version,
-            "smart_download_url": db_app.smart_download_url,
+            "smart_download_url": smart_download_url(db_app),
             "versions": versions_list
         })
     
@@ -318,16 +447,136 @@ def get_tools(session: Session = Depends(get_session)):
                             "group": "Mirror"
                         })
 
+    # 6. Serve icons from our own copies once the icon sync has fetched them
+    for tool in final_tools:
+        tool["icon_url"] = local_icon_url(tool.get("icon_url"))
+
     return final_tools
 
-from typing import List
+def _download_headers(meta: dict) -> dict:
+    return {
+        "Content-Disposition": f"attachment; filename*=utf-8''{quote(meta['filename'])}",
+        "Cache-Control": "public, max-age=86400",
+    }
+
+def _cached_download(request: Request, meta: dict):
+    headers = {**_download_headers(meta), "ETag": meta["etag"]}
+    if request.headers.get("if-none-match") == meta["etag"]:
+        return Response(status_code=304, headers=headers)
+    # FileResponse takes care of Range / If-Range for resumed downloads
+    return FileResponse(meta["path"], media_type=meta["content_type"], headers=headers)
+
+@app.get("/dl/{tool_name}/{version}")
+async def download_installer(tool_name: str, version: str, request: Request, session: Session = Depends(get_session)):
+    """
+    Serves an installer through the local download cache. The first request
+    pulls it from the fastest mirror while streaming it to every concurrent
+    requester; later requests are served from disk with Range/ETag support.
+    Use "latest" as the version for the tool's primary download.
+    """
+    tool = (await run_in_threadpool(catalog_entries, session)).get(tool_name)
+    if not tool:
+        raise HTTPException(status_code=404, detail="Tool not found")
+
+    versions = [v for v in tool.get("versions") or [] if v.get("group") != "Mirror"]
+    if version == "latest":
+        url = versions[0]["url"] if versions else tool.get("smart_download_url")
+    else:
+        url = next((v["url"] for v in versions if v["version"] == version), None)
+    if not url:
+        raise HTTPException(status_code=404, detail="Version not found")
+    if not url.startswith("http"):
+        # Local uploads are already served by us
+        return RedirectResponse(url)
+
+    cached = load_cached(url)
+    if cached:
+        return _cached_download(request, cached)
+
+    fill = start_fill(url)
+    await fill.ready.wait()
+    if fill.error:
+        raise HTTPException(status_code=502, detail=f"Upstream download failed: {fill.error}")
+    if fill.done:
+        cached = load_cached(url)
+        # Evicted by another worker in the meantime: send the client to the mirror
+        return _cached_download(request, cached) if cached else RedirectResponse(get_smart_link(url))
+
+    # Still downloading. A resumed download can't be answered from the fill,
+    # which only streams from byte 0, so send it to the mirror instead
+    if request.headers.get("range"):
+        return RedirectResponse(get_smart_link(url))
+    # Everyone else follows the fill from the start (Range is honoured once cached)
+    headers = {**_download_headers(fill.meta), "Accept-Ranges": "none"}
+    if fill.meta["size"]:
+        headers["Content-Length"] = str(fill.meta["size"])
+    return StreamingResponse(fill.follow(), media_type=fill.meta["content_type"], headers=headers)
 
 # ... (previous imports)
 
+async def _read_glossary_upload(glossary_file: UploadFile) -> dict:
+    try:
+        glossary = await run_in_threadpool(parse_glossary, glossary_file.filename, await glossary_file.read())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse glossary: {str(e)}")
+    if not glossary:
+        raise HTTPException(status_code=400, detail="Glossary is empty")
+    return glossary
+
+def _glossary_info(glossary: Glossary, version: GlossaryVersion) -> dict:
+    return {
+        "id": glossary.id,
+        "name": glossary.name,
+        "version": version.version,
+        "term_count": version.term_count,
+        "created_at": version.created_at,
+    }
+
+@app.post("/api/glossaries")
+async def upload_glossary(
+    glossary_file: UploadFile = File(...),
+    name: Optional[str] = Form(None),
+    session: Session = Depends(get_session),
+):
+    """Stores a glossary once so EPUB jobs can reference it by id."""
+    terms = await _read_glossary_upload(glossary_file)
+    version = await run_in_threadpool(create_glossary, session, name or glossary_file.filename, terms)
+    return _glossary_info(session.get(Glossary, version.glossary_id), version)
+
+@app.post("/api/glossaries/{glossary_id}/versions")
+async def upload_glossary_version(
+    glossary_id: int,
+    glossary_file: UploadFile = File(...),
+    session: Session = Depends(get_session),
+):
+    glossary = session.get(Glossary, glossary_id)
+    if not glossary:
+        raise HTTPException(status_code=404, detail="Glossary not found")
+    terms = await _read_glossary_upload(glossary_file)
+    version = await run_in_threadpool(save_glossary_version, session, glossary, terms)
+    return _glossary_info(glossary, version)
+
+@app.get("/api/glossaries")
+def list_glossaries(session: Session = Depends(get_session)):
+    return session.exec(select(Glossary).order_by(Glossary.id)).all()
+
+@app.get("/api/glossaries/{glossary_id}")
+def get_glossary(glossary_id: int, session: Session = Depends(get_session)):
+    glossary = session.get(Glossary, glossary_id)
+    if not glossary:
+        raise HTTPException(status_code=404, detail="Glossary not found")
+    versions = session.exec(
+        select(GlossaryVersion).where(GlossaryVersion.glossary_id == glossary_id).order_by(GlossaryVersion.version)
+    ).all()
+    return {**glossary.model_dump(), "versions": versions}
+
 @app.post("/api/tools/epub-replace")
 async def epub_replace(
     files: List[UploadFile] = File(...),
-    glossary_file: UploadFile = File(...),
+    glossary_file: Optional[UploadFile] = File(None),
+    glossary_id: Optional[int] = Form(None),
+    glossary_version: Optional[int] = Form(None),
+    session: Session = Depends(get_session),
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
@@ -336,34 +585,29 @@ async def epub_replace(
         if not file.filename.endswith(".epub"):
             raise HTTPException(status_code=400, detail=f"File {file.filename} is not an EPUB")
 
-    glossary_content = await glossary_file.read()
-    glossary = {}
-
-    try:
-        if glossary_file.filename.endswith(".json"):
-            glossary = json.loads(glossary_content.decode("utf-8"))
-        elif glossary_file.filename.endswith(".csv") or glossary_file.filename.endswith(".txt"):
-            csv_str = glossary_content.decode("utf-8")
-            reader = csv.reader(io.StringIO(csv_str))
-            for row in reader:
-                if len(row) >= 2:
-                    glossary[row[0]] = row[1]
-        else:
-             raise HTTPException(status_code=400, detail="Glossary must be JSON or CSV")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to parse glossary: {str(e)}")
-
-    if not glossary:
-        raise HTTPException(status_code=400, detail="Glossary is empty")
-
+    # A stored glossary skips the upload, parse and compile on every job.
+    # Compiling (and loading on a cache miss) a large glossary takes a while, so not on the loop.
+    if glossary_id is not None:
+        matcher = await run_in_threadpool(get_matcher, session, glossary_id, glossary_version)
+        if not matcher:
+            raise HTTPException(status_code=404, detail="Glossary not found")
+    elif glossary_file is not None:
+        matcher = await run_in_threadpool(GlossaryMatcher.from_glossary, await _read_glossary_upload(glossary_file))
+    else:
+        raise HTTPException(status_code=400, detail="Provide glossary_file or glossary_id")
+
+    scratch = ScratchFiles()
     processed_files = []
     total_stats = []
 
     try:
         for file in files:
-            content = await file.read()
-            new_epub_bytes, count = replace_terms_in_epub(content, glossary)
-            processed_files.append((file.filename, new_epub_bytes))
+            epub_path = await scratch.add_upload(file, ".epub")
+            output_path = scratch.new(".epub")
+            count = await run_in_threadpool(replace_terms_in_epub, epub_path, output_path, matcher)
+            # Drop each input as soon as it's done so peak disk use stays low
+            scratch.release(epub_path)
+            processed_files.append((file.filename, output_path))
             total_stats.append(f"{file.filename}: {count} replacements")
 
         # Create report string
@@ -371,43 +615,46 @@ async def epub_replace(
         
         # If single file, return it directly but include stats in header
         if len(processed_files) == 1:
-            filename, content = processed_files[0]
+            filename, output_path = processed_files[0]
             modified_filename = f"modified_{filename}"
             encoded_filename = quote(modified_filename)
             encoded_stats = quote(total_stats[0])
             
-            return Response(
-                content=content,
+            return FileResponse(
+                output_path,
                 media_type="application/epub+zip",
                 headers={
                     "Content-Disposition": f"attachment; filename*=utf-8''{encoded_filename}",
                     "X-Processing-Stats": encoded_stats
-                }
+                },
+                background=BackgroundTask(scratch.cleanup)
             )
         else:
             # Multiple files: Return ZIP
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-                for filename, content in processed_files:
-                    zf.writestr(f"modified_{filename}", content)
+            zip_path = scratch.new(".zip")
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+                for filename, output_path in processed_files:
+                    zf.write(output_path, f"modified_{filename}")
                 zf.writestr("report.txt", report)
             
-            zip_buffer.seek(0)
-            zip_bytes = zip_buffer.read()
-            
             encoded_filename = quote("batch_processed_epubs.zip")
             encoded_stats = quote(f"Processed {len(files)} files")
             
-            return Response(
-                content=zip_bytes,
+            return FileResponse(
+                zip_path,
                 media_type="application/zip",
                 headers={
                     "Content-Disposition": f"attachment; filename*=utf-8''{encoded_filename}",
                     "X-Processing-Stats": encoded_stats
-                }
+                },
+                background=BackgroundTask(scratch.cleanup)
             )
 
+    except UploadTooLarge as e:
+        scratch.cleanup()
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
+        scratch.cleanup()
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
 @app.post("/api/tools/pdf-to-image")
@@ -417,38 +664,160 @@ async def pdf_to_image(
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
-    pdf_content = await file.read()
-
+    scratch = ScratchFiles()
     try:
-        images = convert_pdf_to_images(pdf_content)
-        
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            base_name = file.filename.rsplit('.', 1)[0]
-            for i, img_bytes in enumerate(images):
-                zf.writestr(f"{base_name}_page_{i+1}.png", img_bytes)
-        
-        zip_buffer.seek(0)
-        zip_bytes = zip_buffer.read()
+        pdf_path = await scratch.add_upload(file, ".pdf")
+        zip_path = scratch.new(".zip")
+        base_name = file.filename.rsplit('.', 1)[0]
+        await run_in_threadpool(write_pdf_images_zip, pdf_path, zip_path, base_name)
+        scratch.release(pdf_path)
 
-        filename = f"{file.filename.rsplit('.', 1)[0]}_images.zip"
+        filename = f"{base_name}_images.zip"
         encoded_filename = quote(filename)
 
-        return Response(
-            content=zip_bytes,
+        return FileResponse(
+            zip_path,
             media_type="application/zip",
             headers={
                 "Content-Disposition": f"attachment; filename*=utf-8''{encoded_filename}"
-            }
+            },
+            background=BackgroundTask(scratch.cleanup)
         )
+    except UploadTooLarge as e:
+        scratch.cleanup()
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print(e)
+        scratch.cleanup()
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
 
+async def _spool_images(scratch: ScratchFiles, files: List[UploadFile]) -> List[str]:
+    paths = []
+    for file in files:
+        paths.append(await scratch.add_upload(file, os.path.splitext(file.filename)[1].lower()))
+    return paths
+
+def _image_job_error(scratch: ScratchFiles, e: Exception) -> HTTPException:
+    scratch.cleanup()
+    if isinstance(e, UploadTooLarge):
+        return HTTPException(status_code=413, detail=str(e))
+    if isinstance(e, (UnidentifiedImageError, Image.DecompressionBombError)):
+        return HTTPException(status_code=400, detail="Unsupported or oversized image")
+    print(f"Image job failed: {e}")
+    return HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+@app.post("/api/tools/image-compress")
+async def image_compress(
+    files: List[UploadFile] = File(...),
+    format: str = Form("jpeg"),
+    quality: int = Form(80),
+    target_kb: Optional[int] = Form(None),
+    max_dimension: Optional[int] = Form(None),
+):
+    if not format_supported(format):
+        raise HTTPException(status_code=400, detail=f"Unsupported output format: {format}")
+    if not 1 <= quality <= 100:
+        raise HTTPException(status_code=400, detail="Quality must be between 1 and 100")
+    if target_kb is not None and target_kb < 1:
+        raise HTTPException(status_code=400, detail="Target size must be at least 1 KB")
+    if max_dimension is not None and max_dimension < 1:
+        raise HTTPException(status_code=400, detail="Max dimension must be at least 1 pixel")
+
+    _, extension, media_type = OUTPUT_FORMATS[format]
+    target_bytes = target_kb * 1024 if target_kb else None
+    scratch = ScratchFiles()
+    try:
+        paths = await _spool_images(scratch, files)
+        outputs = [scratch.new(extension) for _ in paths]
+        # Every image in the batch is encoded in parallel across the worker processes
+        results = await asyncio.gather(*(
+            run_in_pool(compress_image, src, dst, format, quality, target_bytes, max_dimension)
+            for src, dst in zip(paths, outputs)
+        ))
+        original_total = sum(os.path.getsize(p) for p in paths)
+        compressed_total = sum(r["size"] for r in results)
+        for path in paths:
+            scratch.release(path)
+
+        names = [f"compressed_{os.path.splitext(f.filename)[0]}{extension}" for f in files]
+        stats = quote(f"{original_total} -> {compressed_total} bytes")
+        if len(outputs) == 1:
+            output_path, filename = outputs[0], names[0]
+        else:
+            output_path, filename, media_type = scratch.new(".zip"), "compressed_images.zip", "application/zip"
+            # Stored, not deflated: the images are already compressed
+            with zipfile.ZipFile(output_path, "w", zipfile.ZIP_STORED) as zf:
+                for path, name in zip(outputs, names):
+                    zf.write(path, name)
+
+        return FileResponse(
+            output_path,
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}",
+                "X-Processing-Stats": stats
+            },
+            background=BackgroundTask(scratch.cleanup)
+        )
+    except Exception as e:
+        raise _image_job_error(scratch, e)
+
+@app.post("/api/tools/image-stitch")
+async def image_stitch(
+    files: List[UploadFile] = File(...),
+    direction: str = Form("horizontal"),
+    scale: float = Form(1.0),
+):
+    if len(files) < 2:
+        raise HTTPException(status_code=400, detail="Upload at least 2 images")
+    if direction not in ("horizontal", "vertical") or not 0 < scale <= 4:
+        raise HTTPException(status_code=400, detail="Invalid direction or scale")
+
+    scratch = ScratchFiles()
+    try:
+        paths = await _spool_images(scratch, files)
+        output_path = scratch.new(".png")
+        result = await run_in_pool(stitch_images, paths, output_path, direction, scale)
+
+        return FileResponse(
+            output_path,
+            media_type="image/png",
+            headers={
+                "Content-Disposition": "attachment; filename*=utf-8''stitched_image.png",
+                "X-Processing-Stats": quote(f"{result['width']}x{result['height']}")
+            },
+            background=BackgroundTask(scratch.cleanup)
+        )
+    except Exception as e:
+        raise _image_job_error(scratch, e)
+
+@app.post("/api/tools/image-to-pdf")
+async def image_to_pdf(
+    files: List[UploadFile] = File(...)
+):
+    scratch = ScratchFiles()
+    try:
+        paths = await _spool_images(scratch, files)
+        output_path = scratch.new(".pdf")
+        result = await run_in_pool(images_to_pdf, paths, output_path)
+
+        return FileResponse(
+            output_path,
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": "attachment; filename*=utf-8''converted_images.pdf",
+                "X-Processing-Stats": quote(f"{result['pages']} pages")
+            },
+            background=BackgroundTask(scratch.cleanup)
+        )
+    except Exception as e:
+        raise _image_job_error(scratch, e)
+
 @app.post("/tools")
 def create_tool(tool: Tool, session: Session = Depends(get_session)):
     session.add(tool)
     session.commit()
+    publish_tool_change(session, {tool.name})
     session.refresh(tool)
     return tool
 
@@ -457,6 +826,7 @@ def update_tool(tool_id: int, tool: Tool, session: Session = Depends(get_session
     db_tool = session.get(Tool, tool_id)
     if not db_tool:
         return {"error": "Tool not found"}
+    old_name = db_tool.name
     
     tool_data = tool.model_dump(exclude_unset=True)
     for key, value in tool_data.items():
@@ -464,15 +834,54 @@ def update_tool(tool_id: int, tool: Tool, session: Session = Depends(get_session
     
     session.add(db_tool)
     session.commit()
+    publish_tool_change(session, {old_name, db_tool.name})
     session.refresh(db_tool)
     return db_tool
 
 @app.post("/crawl")
 async def trigger_crawl(background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
-    await crawl_tools(session)
-    return {"message": "Crawler triggered"}
-
-@app.get("/news")
-async def get_news():
+    history = await crawl_tools(session, on_tools_saved=lambda names: publish_tool_change(session, names))
+    return {"message": "Crawler triggered", "fetchers": [entry.model_dump() for entry in history]}
+
+@app.get("/crawl/history", response_model=List[CrawlHistory])
+def get_crawl_history(limit: int = 100, session: Session = Depends(get_session)):
+    """Per-fetcher timing and outcome of recent crawls, newest first."""
+    statement = select(CrawlHistory).order_by(CrawlHistory.id.desc()).limit(max(1, min(limit, 1000)))
+    return session.exec(statement).all()
+
+@app.get("/mirrors")
+def get_mirrors():
+    return mirror_status()
+
+@app.get("/debug/loop")
+def get_loop_stats(request: Request):
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return loop_monitor.stats()
+
+async def refresh_news():
+    """Fetches the trending feed and publishes it to every worker. Keeps the last good feed on failure."""
     news = await fetch_github_trending()
-    return news
\ No newline at end of file
+    if not news:
+        return None
+    body = CachedPayload.from_items(NEWS_ADAPTER, news).body
+    await run_in_threadpool(shared_set, "news", body)
+    await run_in_threadpool(invalidate, "news")
+    return body
+
+@app.get("/news", response_model=List[NewsItem])
+async def get_news(request: Request):
+    current = await run_in_threadpool(generation, "news")
+    cached = _payload_cache.get("news")
+    if not cached or cached[0] != current:
+        async with _news_lock:
+            body = await run_in_threadpool(shared_get, "news")
+            if body is None:
+                # Cold start: nobody has fetched the feed yet
+                body = await refresh_news()
+                if body is None:
+                    return payload_response(request, CachedPayload(b"[]"))
+                current = await run_in_threadpool(generation, "news")
+            cached = (current, CachedPayload(body, max_age=300))
+            _payload_cache["news"] = cached
+    return payload_response(request, cached[1])
\ No newline at end of file
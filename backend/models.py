@@ -1,4 +1,5 @@
-from typing import Optional
+from typing import List, Optional
+from sqlalchemy import UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 class Tool(SQLModel, table=True):
@@ -13,3 +14,79 @@ class Tool(SQLModel, table=True):
     smart_download_url: Optional[str] = None
     last_updated: Optional[str] = None
     versions_json: Optional[str] = None
+
+
+# Response structs. These are serialized once per cache fill, not per request.
+
+class ToolVersion(SQLModel):
+    version: str
+    url: Optional[str] = None
+    group: Optional[str] = None
+
+class CatalogTool(SQLModel):
+    id: Optional[int] = None
+    name: str
+    category: Optional[str] = None
+    description: Optional[str] = None
+    homepage_url: Optional[str] = None
+    icon_url: Optional[str] = None
+    version: Optional[str] = None
+    smart_download_url: Optional[str] = None
+    versions: List[ToolVersion] = []
+
+class CatalogPage(SQLModel):
+    items: List[CatalogTool] = []
+    next_cursor: Optional[str] = None
+
+class NewsItem(SQLModel):
+    title: str
+    description: str = ""
+    url: str
+    language: str = ""
+
+class FaviconResult(SQLModel):
+    icon: Optional[str] = None
+
+
+class Glossary(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(index=True)
+    latest_version: int = 0
+    created_at: Optional[str] = None
+
+class GlossaryVersion(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("glossary_id", "version"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    glossary_id: int = Field(foreign_key="glossary.id", index=True)
+    version: int
+    term_count: int
+    created_at: Optional[str] = None
+
+
+# Cross-worker coordination (see coordination.py)
+
+class Lease(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    holder: str
+    expires_at: float
+
+class SharedCacheEntry(SQLModel, table=True):
+    key: str = Field(primary_key=True)
+    value: bytes
+    expires_at: Optional[float] = None
+
+class Generation(SQLModel, table=True):
+    name: str = Field(primary_key=True)
+    value: int = 0
+
+
+class CrawlHistory(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: str = Field(index=True)
+    fetcher: str = Field(index=True)
+    started_at: str
+    duration_ms: int
+    outcome: str  # ok | empty | timeout | error
+    tools: int = 0
+    error: Optional[str] = None
@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+from fastapi import Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.staticfiles import StaticFiles
+from pydantic import TypeAdapter
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; the headers would outweigh the savings
+MIN_COMPRESS_SIZE = 1024
+
+# Already-compressed downloads that the response compression middleware must leave alone
+INCOMPRESSIBLE_TYPES = (
+    "application/zip",
+    "application/epub+zip",
+    "application/pdf",
+    "application/octet-stream",
+    "application/x-msi",
+    "application/x-msdownload",
+    "application/x-ms-installer",
+    "application/gzip",
+    "image/*",
+    "audio/*",
+    "video/*",
+    "font/woff",
+    "font/woff2",
+    "text/event-stream",
+)
+
+class DynamicGZipMiddleware(GZipMiddleware):
+    """
+    GZip for dynamic responses that never touches the excluded path prefixes.
+    Installers are served from there with any upstream content type, so a
+    type list alone can't keep them from being recompressed on the fly.
+    """
+
+    def __init__(self, app, exclude_paths: tuple = (), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path, root = scope["path"], scope.get("root_path", "")
+            if root and path.startswith(root):
+                path = path[len(root):]
+            if path.startswith(self.exclude_paths):
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+
+class CachedPayload:
+    """
+    A JSON body serialized once, with its compressed variants built lazily
+    and then reused by every request until the payload is replaced.
+    """
+
+    def __init__(self, body: bytes, max_age: int = 0):
+        self.body = body
+        self.max_age = max_age
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self._encoded = {"identity": body}
+
+    @classmethod
+    def from_items(cls, adapter: TypeAdapter, items, max_age: int = 0) -> "CachedPayload":
+        # pydantic-core validates and serializes in Rust, much faster than json.dumps on dicts
+        return cls(adapter.dump_json(adapter.validate_python(items)), max_age=max_age)
+
+    def encoded(self, encoding: str) -> bytes:
+        if encoding not in self._encoded:
+            if encoding == "br":
+                self._encoded[encoding] = brotli.compress(self.body, quality=11)
+            else:
+                self._encoded[encoding] = gzip.compress(self.body, compresslevel=9)
+        return self._encoded[encoding]
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Picks br, gzip or identity from an Accept-Encoding header (q=0 means refused)."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip())
+    if brotli and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def payload_response(request: Request, payload: CachedPayload) -> Response:
+    headers = {"ETag": payload.etag, "Vary": "Accept-Encoding"}
+    headers["Cache-Control"] = f"public, max-age={payload.max_age}" if payload.max_age else "no-cache"
+    if request.headers.get("if-none-match") == payload.etag:
+        return Response(status_code=304, headers=headers)
+
+    encoding = "identity"
+    if len(payload.body) >= MIN_COMPRESS_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=payload.encoded(encoding), media_type="application/json", headers=headers)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    Static files named by content hash: a name never changes meaning, so
+    clients may cache forever. The files come from third parties, so they are
+    also served inert: no scripts, no sniffing, sandboxed if opened directly.
+    """
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        response.headers["Content-Security-Policy"] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        return response
@@ -0,0 +1,153 @@
+import base64
+import json
+import re
+from typing import Optional
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+# Full-text index over the merged catalog (apps.json + DB tools), one row per
+# tool name. Rows only hold the searchable text; result entries come from the
+# cached catalog so download links always reflect the current mirrors.
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+# bm25 column weights: name, category, description, versions. Computed per
+# query rather than stored as the table's rank config: rewriting the config
+# invalidates statements that other workers have open on the table.
+RANK_FUNCTION = "bm25(tool_search, 10.0, 2.0, 1.0, 1.0)"
+
+TOKEN = re.compile(r"\w+")
+
+
+def ensure_search_index(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tool_search USING fts5("
+            "name, category, description, versions, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+
+def _fields(entry: dict) -> tuple:
+    versions = [v.get("version") or "" for v in entry.get("versions") or []]
+    if entry.get("version"):
+        versions.insert(0, entry["version"])
+    return (
+        entry["name"],
+        entry.get("category") or "",
+        entry.get("description") or "",
+        " ".join(versions),
+    )
+
+
+def sync_search_index(session: Session, catalog: list, names: Optional[set] = None) -> int:
+    """
+    Brings the index in line with the catalog, writing only rows whose text
+    changed. With `names`, only those tools are considered (and removed if
+    they are no longer in the catalog). Returns the number of rows written.
+    """
+    conn = session.connection()
+    existing = {
+        row[1]: row for row in conn.execute(text("SELECT rowid, name, category, description, versions FROM tool_search"))
+    }
+    next_rowid = max((row[0] for row in existing.values()), default=0) + 1
+    written = 0
+
+    for entry in catalog:
+        if names is not None and entry["name"] not in names:
+            existing.pop(entry["name"], None)
+            continue
+        fields = _fields(entry)
+        row = existing.pop(entry["name"], None)
+        if row is None:
+            # New tools go to the end, keeping browse order close to catalog order
+            conn.execute(
+                text("INSERT INTO tool_search(rowid, name, category, description, versions) VALUES (:rowid, :n, :c, :d, :v)"),
+                {"rowid": next_rowid, "n": fields[0], "c": fields[1], "d": fields[2], "v": fields[3]},
+            )
+            next_rowid += 1
+        elif tuple(row[1:]) != fields:
+            conn.execute(
+                text("UPDATE tool_search SET category = :c, description = :d, versions = :v WHERE rowid = :rowid"),
+                {"rowid": row[0], "c": fields[1], "d": fields[2], "v": fields[3]},
+            )
+        else:
+            continue
+        written += 1
+
+    for name, row in existing.items():
+        if names is None or name in names:
+            conn.execute(text("DELETE FROM tool_search WHERE rowid = :rowid"), {"rowid": row[0]})
+            written += 1
+
+    session.commit()
+    return written
+
+
+def _match_expression(q: str) -> Optional[str]:
+    # Every word must match, each as a prefix; quoting keeps FTS5 syntax out of user input
+    tokens = TOKEN.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> list:
+    """
+    Raises ValueError for cursors this module did not produce, including ones
+    from the other kind of query (ranked cursors carry a score, plain ones don't).
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor")
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def search_tools(session: Session, q: str = "", category: Optional[str] = None,
+                 cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> tuple[list, Optional[str]]:
+    """
+    One page of tool names, best match first (catalog order when there is no
+    query), plus the cursor for the next page. Pages are keyset-paginated on
+    (bm25 score, rowid), so deep pages cost the same as the first one.
+    """
+    match = _match_expression(q or "")
+    params = {"limit": limit + 1}
+    where = []
+    if category:
+        where.append("category = :category")
+        params["category"] = category
+
+    if match:
+        where.insert(0, "tool_search MATCH :match")
+        params["match"] = match
+        after = "1"
+        if cursor:
+            params["score"], params["rowid"] = decode_cursor(cursor, 2)
+            after = "(score > :score OR (score = :score AND rowid > :rowid))"
+        sql = (
+            f"SELECT rowid, name, score FROM (SELECT rowid, name, {RANK_FUNCTION} AS score FROM tool_search WHERE {{}}) "
+            f"WHERE {after} ORDER BY score, rowid LIMIT :limit"
+        )
+    else:
+        if cursor:
+            (params["rowid"],) = decode_cursor(cursor, 1)
+            where.append("rowid > :rowid")
+        sql = "SELECT rowid, name FROM tool_search WHERE {} ORDER BY rowid LIMIT :limit"
+
+    rows = session.connection().execute(text(sql.format(" AND ".join(where) or "1")), params).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last[2], last[0]] if match else [last[0]])
+    return [row[1] for row in rows], next_cursor
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# The backend runs from its own directory with flat imports ("from logic...", "from models ...")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def app_client(tmp_path, monkeypatch):
+    """The FastAPI app without its lifespan (no scheduler), run from a scratch directory."""
+    from fastapi.testclient import TestClient
+
+    monkeypatch.chdir(tmp_path)
+    import main
+
+    return TestClient(main.app)
@@ -0,0 +1,48 @@
+import pytest
+
+from logic import accelerator
+
+NODE_URL = "https://nodejs.org/dist/v22.12.0/node-v22.12.0-x64.msi"
+HUAWEI, TUNA, USTC = accelerator.MIRROR_GROUPS["nodejs"]["mirrors"]
+
+
+@pytest.fixture(autouse=True)
+def fresh_scores(monkeypatch):
+    monkeypatch.setattr(accelerator, "_scores", {})
+    monkeypatch.setattr(accelerator, "_samples", {})
+
+
+def test_origins_match_regardless_of_scheme():
+    for url in (NODE_URL, NODE_URL.replace("https://", "http://")):
+        assert accelerator.get_smart_link(url) == HUAWEI + "/v22.12.0/node-v22.12.0-x64.msi"
+    assert accelerator.get_smart_link("http://github.com/o/r/releases/download/v1/a.exe") == \
+        "https://ghproxy.cn/https://github.com/o/r/releases/download/v1/a.exe"
+    assert accelerator.get_smart_link("https://example.com/nodejs.org/dist/x.msi") == "https://example.com/nodejs.org/dist/x.msi"
+
+
+def test_ranking_uses_latency_and_throughput():
+    # Same throughput: the lower rolling latency wins
+    accelerator._record(HUAWEI, latency=2.0, throughput=10_000_000)
+    accelerator._record(TUNA, latency=0.1, throughput=10_000_000)
+    assert accelerator.best_mirror("nodejs") == TUNA
+    # Much higher throughput outweighs a little latency
+    accelerator._record(USTC, latency=0.5, throughput=100_000_000)
+    assert accelerator.best_mirror("nodejs") == USTC
+
+
+def test_mirror_goes_down_only_after_consecutive_failures():
+    accelerator._record(TUNA, latency=0.1, throughput=50_000_000)
+    accelerator._record(TUNA, error="timeout")
+    assert accelerator.best_mirror("nodejs") == TUNA
+
+    accelerator._record(TUNA, latency=0.1, throughput=50_000_000)
+    accelerator._record(TUNA, error="timeout")
+    accelerator._record(TUNA, error="timeout")
+    assert accelerator.best_mirror("nodejs") == HUAWEI
+
+
+def test_origin_is_used_when_every_mirror_is_down():
+    for mirror in (HUAWEI, TUNA, USTC):
+        for _ in range(accelerator.UNHEALTHY_AFTER_FAILURES):
+            accelerator._record(mirror, error="refused")
+    assert accelerator.get_smart_link(NODE_URL) == NODE_URL
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+import coordination
+
+
+@pytest.fixture(autouse=True)
+def shared_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'shared.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(coordination, "engine", engine)
+    monkeypatch.setattr(coordination, "_is_leader", False)
+    monkeypatch.setattr(coordination, "_generations", {})
+    monkeypatch.setattr(coordination, "_generations_checked", 0.0)
+
+
+def _as_worker(monkeypatch, worker_id):
+    # Each worker process has its own module state
+    monkeypatch.setattr(coordination, "WORKER_ID", worker_id)
+    monkeypatch.setattr(coordination, "_is_leader", False)
+
+
+def test_only_one_worker_holds_the_lease(monkeypatch):
+    _as_worker(monkeypatch, "a")
+    assert coordination.renew_leadership()
+    _as_worker(monkeypatch, "b")
+    assert not coordination.renew_leadership()
+    _as_worker(monkeypatch, "a")
+    assert coordination.renew_leadership()
+
+
+def test_expired_or_released_lease_is_taken_over(monkeypatch):
+    _as_worker(monkeypatch, "a")
+    coordination.renew_leadership()
+    coordination.release_leadership()
+    assert not coordination.is_leader()
+
+    _as_worker(monkeypatch, "b")
+    assert coordination.renew_leadership()
+
+    # "b" stops renewing; once the lease has run out "a" takes over
+    monkeypatch.setattr(coordination.time, "time", lambda: 10 ** 10)
+    _as_worker(monkeypatch, "a")
+    assert coordination.renew_leadership()
+
+
+def test_leader_only_jobs_skip_other_workers(monkeypatch):
+    calls = []
+
+    @coordination.leader_only
+    async def job():
+        calls.append(coordination.WORKER_ID)
+
+    _as_worker(monkeypatch, "a")
+    coordination.renew_leadership()
+    asyncio.run(job())
+    _as_worker(monkeypatch, "b")
+    coordination.renew_leadership()
+    asyncio.run(job())
+    assert calls == ["a"]
+
+
+def test_generations_are_seen_by_other_workers_after_polling(monkeypatch):
+    assert coordination.generation("catalog") == 0
+    coordination.invalidate("catalog")
+    assert coordination.generation("catalog") == 1
+
+    # Another worker bumps it; this one notices once its poll interval has passed
+    with coordination.Session(coordination.engine) as session:
+        session.exec(coordination.text("UPDATE generation SET value = 5 WHERE name = 'catalog'"))
+        session.commit()
+    assert coordination.generation("catalog") == 1
+    monkeypatch.setattr(coordination, "_generations_checked", 0.0)
+    assert coordination.generation("catalog") == 5
+
+
+def test_shared_cache_expires(monkeypatch):
+    coordination.shared_set("k", b"v", ttl=60)
+    coordination.shared_set("forever", b"x")
+    assert coordination.shared_get("k") == b"v"
+
+    now = coordination.time.time()
+    monkeypatch.setattr(coordination.time, "time", lambda: now + 120)
+    assert coordination.shared_get("k") is None
+    coordination.purge_expired()
+    assert coordination.shared_get("forever") == b"x"
+
+
+def test_concurrent_writers_of_one_key_do_not_conflict():
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: coordination.shared_set("favicon:x", str(i).encode()), range(200)))
+    assert coordination.shared_get("favicon:x") is not None
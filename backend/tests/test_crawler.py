@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from logic import crawler
+from models import CrawlHistory, Tool
+
+
+def _tool(name, version="1.0"):
+    return {
+        "name": name,
+        "category": "Tools",
+        "version": version,
+        "homepage_url": f"https://{name.lower()}.test/",
+        "original_download_url": f"https://{name.lower()}.test/setup.exe",
+    }
+
+
+async def fast():
+    return [_tool("Alpha"), _tool("Beta")]
+
+
+async def hanging():
+    await asyncio.sleep(30)
+
+
+async def broken():
+    raise ConnectionError("upstream refused\nsecond line")
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "apps.json").write_text(json.dumps([{"fetcher": name} for name in ("fast", "hanging", "broken")]))
+    monkeypatch.setattr(crawler, "FETCHER_MAP", {"fast": fast, "hanging": hanging, "broken": broken})
+    monkeypatch.setattr(crawler, "FETCHER_TIMEOUT_SECONDS", 0.2)
+    # Like the app's engine: the crawler hands the session to worker threads
+    engine = create_engine(f"sqlite:///{tmp_path / 'crawl.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def test_results_are_saved_per_fetcher_with_outcomes(session):
+    published = []
+    history = asyncio.run(crawler.crawl_tools(session, on_tools_saved=published.append))
+
+    outcomes = {h.fetcher: (h.outcome, h.tools, h.error) for h in history}
+    assert outcomes == {
+        "fast": ("ok", 2, None),
+        "broken": ("error", 0, "upstream refused"),
+        "hanging": ("timeout", 0, "no result after 0.2s"),
+    }
+    # The hanging fetcher finishes last and does not hold back the others
+    assert history[-1].fetcher == "hanging"
+    assert published == [{"Alpha", "Beta"}]
+    assert sorted(session.exec(select(Tool.name)).all()) == ["Alpha", "Beta"]
+    assert len(session.exec(select(CrawlHistory)).all()) == 3
+
+
+def test_saving_and_publishing_stay_off_the_event_loop(session, monkeypatch):
+    on_loop = []
+    real_save_tool = crawler._save_tool
+
+    def save_tool(session, data):
+        on_loop.append(asyncio._get_running_loop() is not None)
+        return real_save_tool(session, data)
+
+    monkeypatch.setattr(crawler, "_save_tool", save_tool)
+    asyncio.run(crawler.crawl_tools(session, on_tools_saved=lambda names: on_loop.append(
+        asyncio._get_running_loop() is not None
+    )))
+    assert on_loop == [False, False, False]
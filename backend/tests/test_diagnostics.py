@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+import diagnostics
+
+TOKEN = "s3cret-tökén"
+
+
+@pytest.fixture
+def admin_app(app_client, monkeypatch):
+    import main
+
+    def busy_stats():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return {"stalls": 0}
+
+    monkeypatch.setattr(diagnostics, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(main.loop_monitor, "stats", busy_stats)
+    return app_client
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}, {"X-Admin-Token": "s3cret-toke"}])
+def test_without_the_token_nothing_is_exposed(admin_app, headers):
+    assert admin_app.get("/debug/loop", headers=headers).status_code == 403
+
+    response = admin_app.get("/debug/loop?profile=1", headers=headers)
+    assert response.status_code == 403
+    assert "X-Profile-Samples" not in response.headers
+
+
+def test_non_ascii_tokens_are_compared_not_crashed_on(admin_app):
+    response = admin_app.get("/debug/loop", headers={"X-Admin-Token": "wröng".encode("utf-8")})
+    assert response.status_code == 403
+
+
+def test_no_token_configured_means_no_admin(admin_app, monkeypatch):
+    monkeypatch.setattr(diagnostics, "ADMIN_TOKEN", "")
+    assert admin_app.get("/debug/loop", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_admin_gets_stats_and_folded_stacks(admin_app):
+    headers = {"X-Admin-Token": TOKEN.encode("utf-8")}
+    assert admin_app.get("/debug/loop", headers=headers).json() == {"stalls": 0}
+
+    response = admin_app.get("/debug/loop", headers={**headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert response.headers["X-Profile-Status"] == "200"
+    assert int(response.headers["X-Profile-Samples"]) > 0
+    lines = response.text.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy_stats" in line for line in lines)
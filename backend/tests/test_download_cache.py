@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from logic import download_cache
+
+PAYLOAD = b"x" * 4096
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_cache, "CACHE_DIR", str(tmp_path))
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=httpx.ByteStream(PAYLOAD)))
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(download_cache.httpx, "AsyncClient", lambda **kw: real_client(transport=transport, **kw))
+    return tmp_path
+
+
+def _fill(url):
+    async def run():
+        fill = download_cache.start_fill(url)
+        await fill.task
+        return fill
+    return asyncio.run(run())
+
+
+def test_fill_is_cached_and_readable(cache):
+    fill = _fill("https://example.com/files/setup.exe")
+
+    assert fill.error is None
+    meta = download_cache.load_cached("https://example.com/files/setup.exe")
+    assert meta["filename"] == "setup.exe"
+    assert meta["size"] == len(PAYLOAD)
+    with open(meta["path"], "rb") as f:
+        assert f.read() == PAYLOAD
+    # Nothing but the entry and its metadata is left behind
+    assert sorted(os.listdir(cache)) == sorted([fill.key, fill.key + ".json"])
+
+
+def test_entry_larger_than_cache_survives_its_own_fill(cache, monkeypatch):
+    monkeypatch.setattr(download_cache, "CACHE_MAX_BYTES", len(PAYLOAD) // 2)
+    _fill("https://example.com/a.exe")
+    _fill("https://example.com/b.exe")
+
+    # The older entry makes room; the one just filled is still served
+    assert download_cache.load_cached("https://example.com/a.exe") is None
+    assert download_cache.load_cached("https://example.com/b.exe") is not None
+
+
+def test_stale_part_files_are_removed(cache):
+    stale = cache / "deadbeef.123.part"
+    stale.write_bytes(b"partial")
+    os.utime(stale, (0, 0))
+    fresh = cache / "cafe.456.part"
+    fresh.write_bytes(b"partial")
+
+    download_cache.evict()
+
+    assert not stale.exists()
+    assert fresh.exists()
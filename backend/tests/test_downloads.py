@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+import pytest
+
+from logic import download_cache
+
+INSTALLER = bytes(range(256)) * 64
+REAL_CLIENT = httpx.AsyncClient
+
+
+@pytest.fixture
+def downloads(app_client, monkeypatch):
+    import main
+
+    types = {"app.dmg": "application/x-apple-diskimage", "app.7z": "application/x-7z-compressed"}
+    transport = httpx.MockTransport(lambda request: httpx.Response(
+        200, headers={"Content-Type": types[request.url.path.strip("/")]}, stream=httpx.ByteStream(INSTALLER),
+    ))
+    monkeypatch.setattr(download_cache.httpx, "AsyncClient", lambda **kw: REAL_CLIENT(transport=transport, **kw))
+    versions = [{"version": name, "url": f"https://example.com/{name}"} for name in types]
+    monkeypatch.setattr(main, "catalog_entries", lambda session: {"app": {"name": "app", "versions": versions}})
+    return app_client
+
+
+def _fill(url):
+    async def run():
+        await download_cache.start_fill(url).task
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("name", ["app.dmg", "app.7z"])
+def test_cached_installer_is_sent_uncompressed(downloads, name):
+    _fill(f"https://example.com/{name}")
+
+    response = downloads.get(f"/dl/app/{name}", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == str(len(INSTALLER))
+    assert response.content == INSTALLER
+
+
+class SlowStream(httpx.AsyncByteStream):
+    # Several fill chunks, so readers are let in well before the fill completes
+    body = INSTALLER * 64
+
+    async def __aiter__(self):
+        for offset in range(0, len(self.body), download_cache.CHUNK_SIZE):
+            yield self.body[offset:offset + download_cache.CHUNK_SIZE]
+            await asyncio.sleep(0.05)
+
+
+@pytest.fixture
+def slow_downloads(downloads, monkeypatch):
+    transport = httpx.MockTransport(lambda request: httpx.Response(
+        200, headers={"Content-Type": "application/x-apple-diskimage"}, stream=SlowStream(),
+    ))
+    monkeypatch.setattr(download_cache.httpx, "AsyncClient", lambda **kw: REAL_CLIENT(transport=transport, **kw))
+    return downloads
+
+
+def test_download_during_fill_streams_whole_file_without_ranges(slow_downloads):
+    response = slow_downloads.get("/dl/app/app.dmg", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "none"
+    assert "etag" not in response.headers
+    assert response.content == SlowStream.body
+
+
+def test_resume_during_fill_is_sent_to_the_mirror(slow_downloads):
+    response = slow_downloads.get("/dl/app/app.7z", headers={"Range": "bytes=1000-"}, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == "https://example.com/app.7z"
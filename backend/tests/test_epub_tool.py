@@ -0,0 +1,51 @@
+import zipfile
+
+from logic.epub_tool import replace_terms_in_epub, rewrite_document
+from logic.glossary import GlossaryMatcher
+
+
+def test_entities_are_decoded_for_matching_and_kept_elsewhere():
+    matcher = GlossaryMatcher.from_glossary({"copy": "duplicate", "A & B": "A and B", "Ron’s": "Ron's"})
+    content = b"<p>A &amp; B&nbsp;copy &copy; 2020, Ron&#8217;s</p><p>Tom &amp; Jerry</p>"
+
+    out, count = rewrite_document(content, matcher)
+
+    assert count == 3
+    assert out.decode("utf-8") == "<p>A and B duplicate © 2020, Ron's</p><p>Tom &amp; Jerry</p>"
+
+
+def test_replacements_are_escaped():
+    matcher = GlossaryMatcher.from_glossary({"Ron": "Hermione & Ron"})
+    out, count = rewrite_document(b"<p>Ron</p>", matcher)
+    assert (out, count) == (b"<p>Hermione &amp; Ron</p>", 1)
+
+
+def test_quoted_gt_in_attribute_is_not_text():
+    matcher = GlossaryMatcher.from_glossary({"b": "B", "copy": "duplicate"})
+    out, count = rewrite_document(b'<p title="a>b copy" data-x=\'>copy\'>x</p>', matcher)
+    assert (out, count) == (b'<p title="a>b copy" data-x=\'>copy\'>x</p>', 0)
+
+
+def test_script_style_and_comments_are_untouched():
+    matcher = GlossaryMatcher.from_glossary({"copy": "duplicate"})
+    content = b"<style>.copy{}</style><!-- copy --><script>copy()</script><p>copy</p>"
+    out, count = rewrite_document(content, matcher)
+    assert count == 1
+    assert out == b"<style>.copy{}</style><!-- copy --><script>copy()</script><p>duplicate</p>"
+
+
+def test_epub_entries_keep_order_and_non_documents(tmp_path):
+    source = tmp_path / "in.epub"
+    with zipfile.ZipFile(source, "w") as z:
+        z.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip")
+        z.writestr("OEBPS/ch1.xhtml", "<p>Ron &amp; Harry</p>")
+        z.writestr("OEBPS/style.css", "p { content: 'Ron'; }")
+
+    output = tmp_path / "out.epub"
+    count = replace_terms_in_epub(str(source), str(output), GlossaryMatcher.from_glossary({"Ron & Harry": "R & H"}))
+
+    assert count == 1
+    with zipfile.ZipFile(output) as z:
+        assert z.namelist() == ["mimetype", "OEBPS/ch1.xhtml", "OEBPS/style.css"]
+        assert z.read("OEBPS/ch1.xhtml") == b"<p>R &amp; H</p>"
+        assert z.read("OEBPS/style.css") == b"p { content: 'Ron'; }"
@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+from logic import favicon
+
+PAGE = b'<html><head><title>x</title><link rel="icon" href="/static/icon-32.png" sizes="32x32"></head><body>'
+
+
+def test_icon_links_are_ranked_and_resolved_against_base():
+    async def run():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=(
+            b'<html><head><base href="https://cdn.test/assets/">'
+            b'<link rel="icon" href="small.ico" sizes="16x16">'
+            b'<link rel="apple-touch-icon" href="touch.png" sizes="180x180">'
+            b'</head><body>' + b"x" * 500_000
+        ), headers={"content-type": "text/html"}))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await favicon.discover_icon_links(client, "https://site.test/", {})
+
+    final_url, links = asyncio.run(run())
+    assert final_url == "https://site.test/"
+    assert links == ["https://cdn.test/assets/touch.png", "https://cdn.test/assets/small.ico"]
+
+
+@pytest.fixture
+def redirecting_site(monkeypatch):
+    def upstream(request):
+        url = str(request.url)
+        if url == "https://old.test/":
+            return httpx.Response(301, headers={"location": "https://www.new.test/"})
+        if url == "https://www.new.test/":
+            return httpx.Response(200, content=b"<html><head><title>no icons</title></head></html>",
+                                  headers={"content-type": "text/html"})
+        if url == "https://www.new.test/favicon.ico":
+            return httpx.Response(200, content=b"ICO", headers={"content-type": "image/x-icon"})
+        return httpx.Response(404)
+
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(upstream)
+    monkeypatch.setattr(favicon.httpx, "AsyncClient", lambda **kw: real_client(transport=transport, **kw))
+
+    async def no_browser(url):
+        return None
+    monkeypatch.setattr(favicon, "fetch_icon_via_browser", no_browser)
+
+
+def test_root_icon_comes_from_the_site_after_redirects(redirecting_site):
+    icon = asyncio.run(favicon.resolve_favicon("https://old.test/"))
+    assert icon == "data:image/x-icon;base64,SUNP"
+
+
+def test_race_treats_failing_attempts_as_misses(monkeypatch):
+    monkeypatch.setattr(favicon, "HEDGE_DELAY", 0.01)
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def miss():
+        return None
+
+    async def hit():
+        await asyncio.sleep(0.02)
+        return "icon"
+
+    assert asyncio.run(favicon._race([broken, miss, hit])) == "icon"
+    assert asyncio.run(favicon._race([broken, miss])) is None
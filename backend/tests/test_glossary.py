@@ -0,0 +1,81 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from logic import glossary
+from models import GlossaryVersion
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(glossary, "GLOSSARY_DIR", str(tmp_path / "glossaries"))
+    engine = create_engine(f"sqlite:///{tmp_path / 'glossary.db'}", connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _wait_on_locks(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA busy_timeout=5000")
+
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def test_longest_term_wins_and_replacements_are_not_rescanned():
+    matcher = glossary.GlossaryMatcher.from_glossary({"New": "A", "New York": "B", "B": "C"})
+    assert matcher.sub("New York, New Jersey") == ("B, A Jersey", 2)
+
+
+def test_long_terms_are_rejected():
+    term = "x" * (glossary.MAX_TERM_LENGTH + 1)
+    with pytest.raises(ValueError):
+        glossary.parse_glossary("terms.csv", f"{term},y\n".encode())
+
+    # Every prefix of a maximal term nests one level deeper; it must still compile
+    term = "ab" * (glossary.MAX_TERM_LENGTH // 2)
+    terms = glossary.parse_glossary("terms.csv", "".join(f"{term[:i]},{i}\n" for i in range(1, len(term) + 1)).encode())
+    assert glossary.GlossaryMatcher.from_glossary(terms).sub(term) == (str(len(term)), 1)
+
+
+def test_concurrent_versions_get_distinct_numbers(engine):
+    with Session(engine) as session:
+        glossary_id = glossary.create_glossary(session, "terms", {"a": "b"}).glossary_id
+
+    def upload(i):
+        with Session(engine) as session:
+            return glossary.save_glossary_version(session, session.get(glossary.Glossary, glossary_id), {"a": str(i)}).version, i
+
+    with ThreadPoolExecutor(8) as pool:
+        uploads = dict(pool.map(upload, range(20)))
+    assert sorted(uploads) == list(range(2, 22))
+
+    with Session(engine) as session:
+        assert session.get(glossary.Glossary, glossary_id).latest_version == 21
+        assert len(session.exec(select(GlossaryVersion)).all()) == 21
+        for number, i in uploads.items():
+            assert glossary.get_matcher(session, glossary_id, number).sub("a") == (str(i), 1)
+
+
+def test_epub_job_loads_and_compiles_glossaries_off_the_event_loop(app_client, monkeypatch):
+    import main
+
+    on_loop = []
+    real_from_glossary = glossary.GlossaryMatcher.from_glossary
+
+    def from_glossary(terms):
+        on_loop.append(asyncio._get_running_loop() is not None)
+        return real_from_glossary(terms)
+
+    def get_matcher(session, glossary_id, version=None):
+        on_loop.append(asyncio._get_running_loop() is not None)
+        return None
+
+    monkeypatch.setattr(main.GlossaryMatcher, "from_glossary", from_glossary)
+    monkeypatch.setattr(main, "get_matcher", get_matcher)
+    epub = ("book.epub", b"not really an epub", "application/epub+zip")
+
+    response = app_client.post("/api/tools/epub-replace", files={"files": epub}, data={"glossary_id": "1"})
+    assert response.status_code == 404
+    app_client.post("/api/tools/epub-replace", files={"files": epub, "glossary_file": ("g.csv", b"a,b\n")})
+    assert on_loop == [False, False]
@@ -0,0 +1,116 @@
+import asyncio
+import io
+import os
+
+import httpx
+import pytest
+from PIL import Image
+
+from logic import icon_assets
+
+SVG = (b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 32 32" onload="alert(1)">'
+       b'<circle cx="16" cy="16" r="14" fill="#2878dc"/></svg>')
+
+
+class EndlessStream(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        while True:
+            yield b"\0" * 8192
+
+
+def _png(size=(32, 32)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGBA", size, (200, 40, 40, 255)).save(out, "PNG")
+    return out.getvalue()
+
+
+def test_svg_is_rasterized():
+    data, extension = icon_assets.normalize_icon(SVG, "image/svg+xml")
+    assert extension == ".png"
+    assert b"<svg" not in data
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.size == (icon_assets.ICON_SIZE, icon_assets.ICON_SIZE)
+
+
+def test_raster_icons_are_scaled_down():
+    data, extension = icon_assets.normalize_icon(_png((512, 256)), "image/png")
+    with Image.open(io.BytesIO(data)) as img:
+        assert (extension, img.size) == (".png", (160, 80))
+
+
+def test_non_images_are_rejected():
+    for data, content_type in ((b"<html>hi</html>", "text/html"), (b"<svg", "image/svg+xml")):
+        with pytest.raises(ValueError):
+            icon_assets.normalize_icon(data, content_type)
+
+
+@pytest.fixture
+def icon_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(icon_assets, "ICON_DIR", str(tmp_path))
+    monkeypatch.setattr(icon_assets, "MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(icon_assets, "_manifest", {})
+    monkeypatch.setattr(icon_assets, "_manifest_mtime", None)
+    monkeypatch.setattr(icon_assets, "MAX_ICON_BYTES", 64 * 1024)
+
+    def upstream(request):
+        if request.url.path == "/huge.png":
+            # No Content-Length and no end: only a limit checked while reading stops it
+            return httpx.Response(200, stream=EndlessStream())
+        return httpx.Response(200, content=_png(), headers={"content-type": "image/png"})
+
+    real_client = httpx.AsyncClient
+    transport = httpx.MockTransport(upstream)
+    monkeypatch.setattr(icon_assets.httpx, "AsyncClient", lambda **kw: real_client(transport=transport, **kw))
+    return tmp_path
+
+
+def test_sync_stores_local_copies_and_drops_unused_icons(icon_dir):
+    changed = asyncio.run(icon_assets.sync_icons(["https://a.test/icon.png", "https://a.test/huge.png"]))
+    assert changed == 1
+    local = icon_assets.local_icon_url("https://a.test/icon.png")
+    assert local.startswith(icon_assets.ICON_URL_PREFIX) and local.endswith(".png")
+    # Over the size limit: keeps pointing at the remote URL
+    assert icon_assets.local_icon_url("https://a.test/huge.png") == "https://a.test/huge.png"
+
+    (icon_dir / "0123456789abcdef01234567.svg").write_bytes(SVG)
+    assert asyncio.run(icon_assets.sync_icons([])) == 1
+    assert icon_assets.local_icon_url("https://a.test/icon.png") == "https://a.test/icon.png"
+    # The unused PNG is kept for a grace period; leftover markup is not
+    assert sorted(n for n in os.listdir(icon_dir) if n != "manifest.json") == [local.rsplit("/", 1)[1]]
+
+
+def test_interrupted_write_leaves_no_icon(icon_dir, monkeypatch):
+    real_fdopen = os.fdopen
+
+    class CrashingFile:
+        def __init__(self, f):
+            self.f = f
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            self.f.close()
+
+        def write(self, data):
+            self.f.write(data[:10])
+            raise OSError("disk full")
+
+    monkeypatch.setattr(icon_assets.os, "fdopen", lambda fd, mode: CrashingFile(real_fdopen(fd, mode)))
+    assert asyncio.run(icon_assets.sync_icons(["https://a.test/icon.png"])) == 0
+    assert [n for n in os.listdir(icon_dir) if n != "manifest.json"] == []
+
+    # Nothing truncated was left behind to be skipped, so the next sync stores it
+    monkeypatch.setattr(icon_assets.os, "fdopen", real_fdopen)
+    assert asyncio.run(icon_assets.sync_icons(["https://a.test/icon.png"])) == 1
+    name = icon_assets.local_icon_url("https://a.test/icon.png").rsplit("/", 1)[1]
+    assert (icon_dir / name).read_bytes().startswith(b"\x89PNG")
+
+
+def test_only_stale_temp_files_are_removed(icon_dir):
+    (icon_dir / "fresh.tmp").write_bytes(b"partial")
+    stale = icon_dir / "stale.tmp"
+    stale.write_bytes(b"partial")
+    os.utime(stale, (0, 0))
+    icon_assets._remove_orphans({})
+    assert sorted(os.listdir(icon_dir)) == ["fresh.tmp"]
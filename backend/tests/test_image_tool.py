@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from PIL import Image
+
+from logic import image_tool
+
+
+def _image(path, size, color=(30, 90, 200)):
+    Image.new("RGB", size, color).save(path)
+    return str(path)
+
+
+def test_stitch_scales_to_common_height(tmp_path):
+    paths = [_image(tmp_path / "a.png", (100, 50)), _image(tmp_path / "b.png", (40, 100))]
+    result = image_tool.stitch_images(paths, str(tmp_path / "out.png"), "horizontal", 0.5)
+    assert (result["width"], result["height"]) == (120, 50)
+
+
+def test_stitch_rejects_oversized_canvas(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_tool, "MAX_OUTPUT_PIXELS", 10_000)
+    paths = [_image(tmp_path / "a.png", (100, 50)), _image(tmp_path / "b.png", (100, 50))]
+    with pytest.raises(Image.DecompressionBombError):
+        image_tool.stitch_images(paths, str(tmp_path / "out.png"), "vertical", 4)
+    assert not (tmp_path / "out.png").exists()
+
+
+def test_compress_to_target_size_in_pool(tmp_path):
+    src = tmp_path / "noise.png"
+    Image.effect_noise((400, 400), 80).convert("RGB").save(src)
+
+    async def run():
+        try:
+            return await image_tool.run_in_pool(
+                image_tool.compress_image, str(src), str(tmp_path / "out.jpg"), "jpeg", 90, 40_000
+            )
+        finally:
+            image_tool.shutdown_pool()
+
+    result = asyncio.run(run())
+    assert result["size"] <= 40_000
+    assert 10 <= result["quality"] < 90
+
+
+@pytest.mark.parametrize("field, value", [
+    ("quality", "0"), ("target_kb", "0"), ("target_kb", "-5"), ("max_dimension", "0"), ("max_dimension", "-1"),
+])
+def test_compress_rejects_invalid_options(app_client, tmp_path, field, value):
+    src = _image(tmp_path / "a.png", (20, 20))
+    with open(src, "rb") as f:
+        response = app_client.post(
+            "/api/tools/image-compress", files={"files": ("a.png", f, "image/png")}, data={field: value},
+        )
+    assert response.status_code == 400
@@ -0,0 +1,74 @@
+import asyncio
+import io
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.datastructures import UploadFile
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from logic import ingest
+
+
+async def _form_sizes(request: Request):
+    form = await request.form()
+    return JSONResponse({name: value.size for name, value in form.items()})
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[Route("/upload", _form_sizes, methods=["POST"])])
+    return TestClient(ingest.RequestSizeLimit(app, max_bytes=10_000))
+
+
+def test_body_under_the_limit_passes(client):
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * 5000)})
+    assert response.status_code == 200
+    assert response.json() == {"file": 5000}
+
+
+def test_declared_length_over_the_limit_is_refused(client):
+    response = client.post("/upload", files={"file": ("a.bin", b"x" * 20_000)})
+    assert response.status_code == 413
+
+
+def test_chunked_body_is_cut_off_while_streaming():
+    app = Starlette(routes=[Route("/upload", _form_sizes, methods=["POST"])])
+    middleware = ingest.RequestSizeLimit(app, max_bytes=10_000)
+    # No Content-Length: only the running total can catch this one
+    chunks = [b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.bin"\r\n\r\n']
+    chunks += [b"x" * 1000] * 100 + [b"\r\n--b--\r\n"]
+    read, sent = [], []
+
+    async def receive():
+        read.append(chunks[len(read)])
+        return {"type": "http.request", "body": read[-1], "more_body": len(read) < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/upload", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=b")],
+    }
+    asyncio.run(middleware(scope, receive, send))
+    assert sent[0]["status"] == 413
+    assert len(read) < 20
+
+
+def test_upload_over_the_per_file_limit_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "SPOOL_DIR", str(tmp_path))
+    scratch = ingest.ScratchFiles()
+
+    async def spool(size):
+        return await scratch.add_upload(UploadFile(io.BytesIO(b"x" * size), filename="doc.pdf"), ".pdf", max_bytes=4096)
+
+    path = asyncio.run(spool(4096))
+    assert os.path.getsize(path) == 4096
+    with pytest.raises(ingest.UploadTooLarge):
+        asyncio.run(spool(4097))
+    scratch.cleanup()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,53 @@
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+import payloads
+
+BODY = b'{"items": [' + b'"abcdefgh", ' * 500 + b'"end"]}'
+
+
+def _request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/tools", "headers": raw})
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=0.5, br;q=0", "gzip"),
+    ("br;q=0.0, gzip;q=0", "identity"),
+    ("*", "identity"),
+    ("", "identity"),
+])
+def test_negotiate_encoding(header, expected, monkeypatch):
+    monkeypatch.setattr(payloads, "brotli", pytest.importorskip("brotli"))
+    assert payloads.negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(payloads, "brotli", None)
+    assert payloads.negotiate_encoding("br, gzip") == "gzip"
+
+
+def test_variants_decode_to_the_body():
+    payload = payloads.CachedPayload(BODY)
+    assert gzip.decompress(payload.encoded("gzip")) == BODY
+    assert payload.encoded("gzip") is payload.encoded("gzip")
+    if payloads.brotli:
+        assert payloads.brotli.decompress(payload.encoded("br")) == BODY
+
+    response = payloads.payload_response(_request(accept_encoding="gzip"), payload)
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == BODY
+
+
+def test_matching_etag_gets_empty_304():
+    payload = payloads.CachedPayload(BODY, max_age=60)
+    response = payloads.payload_response(_request(if_none_match=payload.etag, accept_encoding="gzip"), payload)
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == payload.etag
+    assert "content-encoding" not in response.headers
+
+    assert payloads.payload_response(_request(if_none_match='"other"'), payload).status_code == 200
@@ -0,0 +1,84 @@
+import pytest
+from sqlmodel import Session, create_engine
+
+from search_index import decode_cursor, ensure_search_index, search_tools, sync_search_index
+
+
+def _entry(name, category="Tools", description="", version=None):
+    return {"name": name, "category": category, "description": description, "version": version, "versions": []}
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    ensure_search_index(engine)
+    # A second start (another worker) must not touch the existing index
+    ensure_search_index(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _all_pages(session, q="", category=None, limit=2):
+    names, cursor, pages = [], None, 0
+    while True:
+        page, cursor = search_tools(session, q, category, cursor, limit)
+        names += page
+        pages += 1
+        if not cursor:
+            return names, pages
+
+
+def test_browse_pages_follow_catalog_order(session):
+    catalog = [_entry(f"Tool {i}") for i in range(5)]
+    assert sync_search_index(session, catalog) == 5
+
+    names, pages = _all_pages(session)
+    assert names == [f"Tool {i}" for i in range(5)]
+    assert pages == 3
+
+
+def test_search_pages_rank_name_matches_first_without_repeats(session):
+    catalog = [
+        _entry("Editor", description="notepad style editor"),
+        _entry("Notepad++", category="Editors"),
+        _entry("Notepad Next", category="Editors"),
+        _entry("Unrelated"),
+    ]
+    sync_search_index(session, catalog)
+
+    names, _ = _all_pages(session, "note", limit=1)
+    assert sorted(names[:2]) == ["Notepad Next", "Notepad++"]
+    assert names[2:] == ["Editor"]
+
+    names, _ = _all_pages(session, "note", category="Tools", limit=1)
+    assert names == ["Editor"]
+
+
+def test_sync_only_writes_changes_and_removes_named_tools(session):
+    catalog = [_entry("A", version="1"), _entry("B")]
+    sync_search_index(session, catalog)
+    assert sync_search_index(session, catalog) == 0
+
+    catalog[0]["version"] = "2"
+    assert sync_search_index(session, catalog, {"A"}) == 1
+    assert search_tools(session, "2")[0] == ["A"]
+
+    assert sync_search_index(session, catalog[:1], {"B"}) == 1
+    assert _all_pages(session)[0] == ["A"]
+
+
+def test_invalid_cursor_is_rejected(session):
+    for cursor in ("not-base64!", "eyJhIjogMX0", "WyJ4Il0"):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, 1)
+
+
+def test_cursor_from_the_other_kind_of_query_is_rejected(session):
+    sync_search_index(session, [_entry(f"Note {i}") for i in range(3)])
+    _, ranked_cursor = search_tools(session, "note", limit=1)
+    _, plain_cursor = search_tools(session, "", limit=1)
+
+    with pytest.raises(ValueError, match="^Invalid cursor$"):
+        search_tools(session, "", cursor=ranked_cursor)
+    with pytest.raises(ValueError, match="^Invalid cursor$"):
+        search_tools(session, "note", cursor=plain_cursor)
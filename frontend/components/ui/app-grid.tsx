@@ -2,7 +2,7 @@
 
 import { useEffect, useState, useRef } from "react";
 import { motion, AnimatePresence } from "framer-motion";
-import { Terminal, Code2, Database, Globe, Container, GitGraph, AppWindow, Zap, Box, Package, Clapperboard, Gamepad, Video, Apple, Smartphone, Plus, Pencil, Trash2, X, Download, ChevronDown, Upload, FileUp, MessageSquare, MessageCircle } from "lucide-react";
+import { Search, Terminal, Code2, Database, Globe, Container, GitGraph, AppWindow, Zap, Box, Package, Clapperboard, Gamepad, Video, Apple, Smartphone, Plus, Pencil, Trash2, X, Download, ChevronDown, Upload, FileUp, MessageSquare, MessageCircle } from "lucide-react";
 import { useLanguage } from "@/lib/language-context";
 import { useOS } from "@/lib/hooks";
 
@@ -46,6 +46,9 @@ const ICON_MAP: Record<string, any> = {
   "TikTok": Smartphone
 };
 
+// Tools per request; the catalog is paged by /tools/search instead of loaded whole
+const PAGE_SIZE = 48;
+
 export function AppGrid({ isAdmin }: { isAdmin: boolean }) {
   const { t } = useLanguage();
   const os = useOS();
@@ -53,6 +56,9 @@ export function AppGrid({ isAdmin }: { isAdmin: boolean }) {
   const [editingApp, setEditingApp] = useState<Tool | null>(null);
   const [isFormOpen, setIsFormOpen] = useState(false);
   const [failedImages, setFailedImages] = useState<Record<string, boolean>>({});
+  const [query, setQuery] = useState("");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   // State for version selection modal
   const [selectedAppForDownload, setSelectedAppForDownload] = useState<Tool | null>(null);
@@ -72,21 +78,42 @@ export function AppGrid({ isAdmin }: { isAdmin: boolean }) {
   const [isUploading, setIsUploading] = useState(false);
   const fileInputRef = useRef<HTMLInputElement>(null);
 
-  const fetchTools = async () => {
+  // Only the latest request may update the grid; a slower response for an
+  // earlier query must not overwrite the results for the current one
+  const fetchController = useRef<AbortController | null>(null);
+
+  const fetchTools = async (cursor?: string) => {
+    fetchController.current?.abort();
+    const controller = new AbortController();
+    fetchController.current = controller;
     try {
-      const res = await fetch("/api/py/tools");
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) });
+      if (query) params.set("q", query);
+      if (cursor) params.set("cursor", cursor);
+      const res = await fetch(`/api/py/tools/search?${params}`, { signal: controller.signal });
       if (res.ok) {
         const data = await res.json();
-        setApps(data);
+        if (controller.signal.aborted) return;
+        setApps(prev => cursor ? [...prev, ...data.items] : data.items);
+        setNextCursor(data.next_cursor);
       }
     } catch (e) {
-      console.log("Failed to fetch tools.", e);
+      if (!controller.signal.aborted) console.log("Failed to fetch tools.", e);
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    await fetchTools(nextCursor);
+    setLoadingMore(false);
+  };
+
   useEffect(() => {
-    fetchTools();
-  }, []);
+    // Debounce typing; the first page loads immediately
+    const timer = setTimeout(() => fetchTools(), query ? 250 : 0);
+    return () => clearTimeout(timer);
+  }, [query]);
 
   const resetForm = () => {
     setName("");
@@ -231,8 +258,18 @@ export function AppGrid({ isAdmin }: { isAdmin: boolean }) {
 
   return (
     <div className="flex flex-col gap-12 w-full">
+      <div className="flex items-center gap-4 -mb-8">
+        <div className="flex items-center gap-2 flex-1 max-w-sm glass rounded-xl px-4 py-2">
+          <Search className="w-4 h-4 opacity-50" />
+          <input
+            value={query}
+            onChange={e => setQuery(e.target.value)}
+            placeholder={t("searchApps")}
+            className="flex-1 bg-transparent outline-none text-sm"
+          />
+        </div>
       {isAdmin && (
-        <div className="flex justify-end -mb-8">
+        <div className="flex justify-end flex-1">
            <button 
             onClick={() => setIsFormOpen(true)}
             className="flex items-center gap-2 bg-blue-500 text-white px-4 py-2 rounded-xl font-bold shadow-lg shadow-blue-500/20 hover:scale-105 transition-transform"
@@ -241,6 +278,7 @@ export function AppGrid({ isAdmin }: { isAdmin: boolean }) {
            </button>
         </div>
       )}
+      </div>
 
       {/* Version Selection Modal */}
       <AnimatePresence>
@@ -464,6 +502,18 @@ export function AppGrid({ isAdmin }: { isAdmin: boolean }) {
             </div>
           </div>
       ))}
+
+      {nextCursor && (
+        <div className="flex justify-center">
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="px-6 py-2 bg-foreground/5 hover:bg-foreground/10 rounded-xl text-sm font-bold disabled:opacity-50"
+          >
+            {t("loadMore")}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -4,6 +4,7 @@ import { useState, useRef } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import { Upload, Download, X, Loader2, ImageIcon, Sliders } from "lucide-react";
 import { useLanguage } from "@/lib/language-context";
+import { shouldUseServer, postImageJob } from "@/lib/utils";
 
 export function ImageCompression() {
   const { t } = useLanguage();
@@ -28,6 +29,20 @@ export function ImageCompression() {
 
   const compress = async (file: File, q: number) => {
     setCompressing(true);
+    if (shouldUseServer([file])) {
+      try {
+        const blob = await postImageJob("image-compress", [file], { format: "jpeg", quality: String(Math.round(q * 100)) });
+        if (compressedImage?.startsWith("blob:")) URL.revokeObjectURL(compressedImage);
+        setCompressedImage(URL.createObjectURL(blob));
+        setCompressedBlob(blob);
+        setStats({ original: file.size, compressed: blob.size });
+      } catch (e) {
+        console.error("Compression failed", e);
+      } finally {
+        setCompressing(false);
+      }
+      return;
+    }
     try {
       const img = new Image();
       const url = URL.createObjectURL(file);
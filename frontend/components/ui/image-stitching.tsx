@@ -4,6 +4,7 @@ import { useState, useRef, useEffect } from "react";
 import { motion, AnimatePresence, Reorder } from "framer-motion";
 import { Upload, Download, X, Loader2, LayoutGrid, ArrowLeftRight, ArrowUpDown, Trash2, Plus } from "lucide-react";
 import { useLanguage } from "@/lib/language-context";
+import { shouldUseServer, postImageJob } from "@/lib/utils";
 
 type StitchItem = {
   id: string;
@@ -58,6 +59,14 @@ export function ImageStitching() {
     setStitching(true);
 
     try {
+      const files = items.map(i => i.file);
+      if (shouldUseServer(files)) {
+        const blob = await postImageJob("image-stitch", files, { direction, scale: String(scale) });
+        if (stitchedUrl?.startsWith("blob:")) URL.revokeObjectURL(stitchedUrl);
+        setStitchedUrl(URL.createObjectURL(blob));
+        return;
+      }
+
       const loadImg = (item: StitchItem): Promise<HTMLImageElement> => {
         return new Promise((resolve) => {
           const img = new Image();
@@ -5,6 +5,7 @@ import { motion, AnimatePresence, Reorder } from "framer-motion";
 import { Upload, FileText, Download, X, Image as ImageIcon, Loader2, Trash2 } from "lucide-react";
 import jsPDF from "jspdf";
 import { useLanguage } from "@/lib/language-context";
+import { shouldUseServer, postImageJob } from "@/lib/utils";
 
 type ImageItem = {
   id: string;
@@ -47,6 +48,19 @@ export function ImageToPdf() {
     setConverting(true);
 
     try {
+      const files = images.map(img => img.file);
+      if (shouldUseServer(files)) {
+        const blob = await postImageJob("image-to-pdf", files);
+        const url = URL.createObjectURL(blob);
+        const a = document.createElement("a");
+        a.href = url;
+        a.download = "converted_images.pdf";
+        a.click();
+        // Revoking right away can cancel the download before it starts
+        setTimeout(() => URL.revokeObjectURL(url), 60_000);
+        return;
+      }
+
       const doc = new jsPDF();
       
       for (let i = 0; i < images.length; i++) {
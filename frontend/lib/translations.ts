@@ -92,6 +92,8 @@ export const translations = {
     toggleSidePanel: "Toggle Side Panel",
     adminMode: "Admin Mode",
     addApp: "Add App",
+    searchApps: "Search apps...",
+    loadMore: "Load more",
     editApp: "Edit App",
     appName: "App Name",
     category: "Category",
@@ -210,6 +212,8 @@ export const translations = {
     toggleSidePanel: "切换侧边栏",
     adminMode: "管理模式",
     addApp: "添加应用",
+    searchApps: "搜索应用...",
+    loadMore: "加载更多",
     editApp: "编辑应用",
     appName: "应用名称",
     category: "分类",
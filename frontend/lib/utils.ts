@@ -4,3 +4,26 @@ import { twMerge } from "tailwind-merge";
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs));
 }
+
+// Batches larger than this are sent to the backend image pipeline instead of
+// being drawn on a <canvas> on the main thread.
+const SERVER_BATCH_BYTES = 15 * 1024 * 1024;
+const SERVER_BATCH_FILES = 20;
+
+export function shouldUseServer(files: File[]) {
+  const total = files.reduce((sum, f) => sum + f.size, 0);
+  return total > SERVER_BATCH_BYTES || files.length > SERVER_BATCH_FILES;
+}
+
+export async function postImageJob(tool: string, files: File[], fields: Record<string, string> = {}) {
+  const formData = new FormData();
+  files.forEach((f) => formData.append("files", f));
+  Object.entries(fields).forEach(([k, v]) => formData.append(k, v));
+
+  const response = await fetch(`/api/py/api/tools/${tool}`, { method: "POST", body: formData });
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.detail || "Processing failed");
+  }
+  return response.blob();
+}
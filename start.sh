@@ -20,6 +20,8 @@ echo "🚀 Starting SimpleStart services..."
 
 # Default Ports (can be overridden by environment variables)
 BACKEND_PORT=${BACKEND_PORT:-8001}
+# Worker processes for the backend; background jobs run in only one of them
+export BACKEND_WORKERS=${BACKEND_WORKERS:-1}
 FRONTEND_PORT=${FRONTEND_PORT:-3000}
 
 # --- Start Backend ---
@@ -30,7 +32,7 @@ source venv/bin/activate
 # Ensure Playwright browsers are installed
 playwright install chromium
 # Run uvicorn in background
-uvicorn main:app --host 0.0.0.0 --port $BACKEND_PORT &
+uvicorn main:app --host 0.0.0.0 --port $BACKEND_PORT --workers $BACKEND_WORKERS &
 BACKEND_PID=$!
 cd ..
 